@@ -1,16 +1,31 @@
 import streamlit as st
+from dotenv import load_dotenv
+# Project modules read their config from the environment when imported, so
+# .env has to be loaded before any of them
+load_dotenv()
+import diagnostics
+diagnostics.mark("first script run started")
 import os
 import json
-from dotenv import load_dotenv
-from fpdf import FPDF
-import plotly.express as px
-import pandas as pd
-from groq import Groq
 import base64
 import hashlib
+import io
 import math
-import re
 import sys
+from coach import (analyze_profile_stream, get_roadmap_stream, recommend_skills_plus, recommended_skill_names,
+                   similar_profiles, suggest_job_profiles)
+import llm
+import metrics
+from mcq import MCQ_TOTAL, shuffled
+from models import (parse_roadmap_weeks, parse_skill_rows, profile_records, roadmap_hash, roadmap_record_fields,
+                    skill_record_fields)
+from grading import POLICY, attempt_record, grade, week_score
+from progress import new_progress, progress_for_roadmap, record_score, restore_progress
+import question_bank
+import jobs
+from jobs import get_job_queue
+from user_store import get_store
+import auth
 
 
 # ---- FULL WIDTH / WIREFRAME CSS ----
@@ -38,69 +53,253 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-# Optional background image as before
-if os.path.exists("career coach.png"):
-    with open("career coach.png", "rb") as img_file:
+# Optional background image. Set BACKGROUND_IMAGE_URL to serve it from a CDN or
+# Streamlit static serving instead of inlining it; BACKGROUND_MAX_WIDTH /
+# BACKGROUND_JPEG_QUALITY downscale and recompress it once at startup.
+BACKGROUND_IMAGE = "career coach.png"
+BACKGROUND_MAX_WIDTH = int(os.getenv("BACKGROUND_MAX_WIDTH", "0"))
+BACKGROUND_JPEG_QUALITY = int(os.getenv("BACKGROUND_JPEG_QUALITY", "0"))
+
+
+def load_background_image(path):
+    with open(path, "rb") as img_file:
         img_bytes = img_file.read()
-    img_base64 = base64.b64encode(img_bytes).decode()
-    st.markdown(
-        f"""
+    if not (BACKGROUND_MAX_WIDTH or BACKGROUND_JPEG_QUALITY):
+        return img_bytes, "image/png" if img_bytes.startswith(b"\x89PNG") else "image/jpeg"
+    from PIL import Image
+    image = Image.open(io.BytesIO(img_bytes))
+    if BACKGROUND_MAX_WIDTH and image.width > BACKGROUND_MAX_WIDTH:
+        image.thumbnail((BACKGROUND_MAX_WIDTH, image.height))
+    out = io.BytesIO()
+    image.convert("RGB").save(out, "JPEG", quality=BACKGROUND_JPEG_QUALITY or 85, optimize=True)
+    return out.getvalue(), "image/jpeg"
+
+
+# Built once per process instead of re-reading and re-encoding the image on every rerun
+@st.cache_resource
+def background_css():
+    url = os.getenv("BACKGROUND_IMAGE_URL")
+    if not url:
+        if not os.path.exists(BACKGROUND_IMAGE):
+            return ""
+        img_bytes, mime = load_background_image(BACKGROUND_IMAGE)
+        url = f"data:{mime};base64,{base64.b64encode(img_bytes).decode()}"
+    return f"""
         <style>
         .stApp {{
-            background-image: url("data:image/jpg;base64,{img_base64}");
+            background-image: url("{url}");
             background-size: cover;
             background-repeat: no-repeat;
             background-attachment: fixed;
             background-position: center;
         }}
         </style>
-        """,
-        unsafe_allow_html=True,
-    )
+        """
 
 
-load_dotenv()
-groq_api_key = os.getenv("GROQ_API_KEY")
-client = Groq(api_key=groq_api_key)
+page_background = background_css()
+if page_background:
+    st.markdown(page_background, unsafe_allow_html=True)
+
+
+# Usernames (comma separated) allowed to see the Admin Metrics page. Sign-up
+# is open, so a listed name only counts if its account already exists when the
+# process starts (see admin_users): create the account, then list it and restart
+ADMIN_USERS = {u.strip() for u in os.getenv("ADMIN_USERS", "").split(",") if u.strip()}
+# Serve Prometheus metrics at :METRICS_PORT/metrics when set
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+# Where the admin page writes its profile export for the cohort report
+COHORT_EXPORT_PATH = os.getenv("COHORT_EXPORT_PATH", "profiles_export.parquet")
+
+
+@st.cache_resource
+def metrics_server():
+    return metrics.start_http_server(METRICS_PORT) if METRICS_PORT else None
+
+
+metrics_server()
 
 
-USER_DB_FILE = "users_db.json"
+# Fixed for the life of the process, so signing up as a listed name that had
+# no account yet does not grant the Admin page
+@st.cache_resource
+def admin_users():
+    return frozenset(name for name in ADMIN_USERS if get_store().get_password(name) is not None)
+
+
+admin_users()
+
+
+# Rendered roadmap PDFs, keyed by roadmap hash and scores and shared by all sessions
+@st.cache_data(max_entries=256, show_spinner=False)
+def roadmap_pdf(roadmap_key, scores, _roadmap_text, _weeks):
+    from pdf_export import render_roadmap_pdf
+    return render_roadmap_pdf(_roadmap_text, [(w.week, w.task) for w in _weeks], dict(scores))
+
+
+# Dashboard table and chart, rebuilt only when the roadmap or its progress aggregates change
+@st.cache_data(max_entries=256, show_spinner=False)
+def dashboard_view(roadmap_key, scores, mastered, _weeks):
+    # pandas and plotly are only imported once someone opens the dashboard
+    import pandas as pd
+    import plotly.express as px
+    scores, mastered = dict(scores), set(mastered)
+    rows = [[w.week, w.task, scores.get(w.week, 0), "Pass" if w.week in mastered else "Fail"] for w in _weeks]
+    table = pd.DataFrame(rows, columns=["Week", "Task", "Score", "Status"])
+    figure = None
+    if rows:
+        figure = px.line(x=[row[0] for row in rows], y=[row[2] for row in rows], markers=True,
+                         labels={'x': 'Week', 'y': 'Score'})
+    mastered_tasks = [w.task for w in _weeks if w.week in mastered]
+    upcoming = [w.week for w in _weeks if w.week not in mastered]
+    return table, figure, mastered_tasks, upcoming
 
 
-def load_users():
-    if not os.path.exists(USER_DB_FILE):
-        return {}
-    with open(USER_DB_FILE, "r") as f:
-        return json.load(f)
-def save_users(users):
-    with open(USER_DB_FILE, "w") as f:
-        json.dump(users, f, indent=2)
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
 def authenticate_user(username, password):
-    users = load_users()
-    if username in users:
-        hashed = hash_password(password)
-        if users[username]["password"] == hashed:
-            return True
-    return False
+    return auth.authenticate(username, password)
 def register_user(username, password, profile=None):
-    users = load_users()
-    if username in users:
-        return False
-    users[username] = {"password": hash_password(password), "profile": profile or {}}
-    save_users(users)
-    return True
+    return auth.register(username, password, profile)
 def save_user_profile(username, profile_data):
-    users = load_users()
-    if username in users:
-        users[username]["profile"] = profile_data
-        save_users(users)
+    get_store().replace_profile(username, profile_data)
 def load_user_profile(username):
-    users = load_users()
-    if username in users:
-        return users[username].get("profile", {})
-    return {}
+    return get_store().get_profile(username)
+def update_user_profile(username, changes, remove=()):
+    return get_store().update_profile(username, changes, remove)
+
+
+# Raw LLM text and its parsed records always change together
+def set_skills_list(skills_text):
+    st.session_state.skills_list = skills_text
+    st.session_state.skill_rows = parse_skill_rows(skills_text)
+    return {'skills_list': skills_text, **skill_record_fields(st.session_state.skill_rows)}
+def set_roadmap_text(roadmap_text):
+    st.session_state.roadmap_text = roadmap_text
+    st.session_state.roadmap_weeks = parse_roadmap_weeks(roadmap_text)
+    return {'roadmap_text': roadmap_text, **roadmap_record_fields(st.session_state.roadmap_weeks)}
+def set_progress(progress):
+    st.session_state.progress = progress
+    st.session_state.assessment_scores = progress["scores"]
+    st.session_state.mastered_skills = set(progress["mastered"])
+    st.session_state.current_week_index = progress["current_week_index"]
+    return {'progress': progress}
+def save_progress():
+    progress = st.session_state.progress
+    progress["scores"] = st.session_state.assessment_scores
+    progress["mastered"] = sorted(st.session_state.mastered_skills)
+    progress["current_week_index"] = st.session_state.current_week_index
+    update_user_profile(st.session_state.username, {'progress': progress})
+def apply_profile_changes(changes):
+    if 'profile_analysis' in changes:
+        st.session_state.profile_analysis = changes['profile_analysis']
+    if 'skills_list' in changes:
+        set_skills_list(changes['skills_list'])
+    if 'roadmap_text' in changes:
+        set_roadmap_text(changes['roadmap_text'])
+    if 'progress' in changes:
+        set_progress(changes['progress'])
+    if 'aspirations' in changes:
+        st.session_state.aspirations = changes['aspirations']
+def aspirations_key(goal, skills, roadmap_skills):
+    payload = json.dumps([goal.strip().lower(), skills.strip().lower(), list(roadmap_skills)])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+# Background generations run on the jobs.get_job_queue() pool, outside any
+# script run: they write their result to the profile and return the profile
+# changes for the sessions to pick up. They must not touch st.session_state.
+JOB_LABELS = {
+    "analysis": "Profile analysis",
+    "skills": "Skill recommendations",
+    "roadmap": "Roadmap",
+    "aspirations": "Job suggestions",
+    "mcqs": "MCQ generation",
+}
+JOB_POLL_INTERVAL = 0.2
+def save_job_changes(job, username, changes):
+    # A newer submission of the same action wins; this one's output stays in the LLM caches only
+    if not job.superseded:
+        update_user_profile(username, changes)
+    return changes
+def stream_into_job(job, chunks):
+    text = ""
+    for chunk in chunks:
+        text += chunk
+        job.update(text)
+    return text.strip()
+def analysis_job(job, username, role, skills, goal, bypass_cache=False):
+    text = stream_into_job(job, analyze_profile_stream(role, skills, goal, bypass_cache=bypass_cache))
+    return save_job_changes(job, username, {'profile_analysis': text})
+def skills_job(job, username, role, skills, goal, bypass_cache=False, then_aspirations=False):
+    skills_text = recommend_skills_plus(role, skills, goal, bypass_cache=bypass_cache)
+    changes = save_job_changes(job, username, {'skills_list': skills_text,
+                                               **skill_record_fields(parse_skill_rows(skills_text))})
+    if then_aspirations and not job.superseded:
+        # Same params the Learning Roadmap tab builds from these rows, so it joins this job
+        planned = recommended_skill_names(skills_text)
+        get_job_queue().submit(username, "aspirations", job_params(role, skills, goal, planned), aspirations_job,
+                             username, role, skills, goal, planned)
+    return changes
+def roadmap_job(job, username, role, skills, goal, roadmap_skills, bypass_cache=False):
+    roadmap_text = stream_into_job(job, get_roadmap_stream(role, skills, goal, roadmap_skills,
+                                                           bypass_cache=bypass_cache))
+    weeks = parse_roadmap_weeks(roadmap_text)
+    progress = progress_for_roadmap(load_user_profile(username).get('progress'), roadmap_text)
+    if weeks:
+        # Warm the shared question bank so the first assessment is ready
+        question_bank.pregenerate(weeks[0].task)
+    return save_job_changes(job, username, {'roadmap_text': roadmap_text, **roadmap_record_fields(weeks),
+                                            'progress': progress})
+def aspirations_job(job, username, role, skills, goal, planned_skills, bypass_cache=False):
+    markdown = suggest_job_profiles(goal, skills, planned_skills, bypass_cache)
+    return save_job_changes(job, username, {'aspirations': {"key": aspirations_key(goal, skills, planned_skills),
+                                                            "markdown": markdown}})
+def mcq_job(job, week, task, regenerate=False):
+    def show_progress(question, questions):
+        job.update(f"{len(questions)}/{MCQ_TOTAL} ready (latest: {question['question']})")
+    questions, errors = question_bank.get_or_generate(task, on_question=show_progress, regenerate=regenerate)
+    return {"week": week, "questions": questions, "errors": errors}
+def job_params(*inputs, regenerate=False):
+    # Every call site builds params the same way, so a click collapses into a
+    # running job with the same inputs (e.g. one Prepare Everything started);
+    # only a regenerate asks for a fresh one
+    return list(inputs) + ([True] if regenerate else [])
+def start_job(action, params, fn, *args):
+    return get_job_queue().submit(st.session_state.username, action, params, fn, *args)
+def collect_job(action):
+    # Copy a finished job's result into this session once; returns the job when it was new
+    job = get_job_queue().latest(st.session_state.username, action)
+    applied = st.session_state.setdefault("applied_jobs", {})
+    if job is None or not job.finished or applied.get(action) == job.id:
+        return None
+    applied[action] = job.id
+    if job.status == jobs.DONE:
+        if action == "mcqs":
+            if job.result["questions"]:
+                st.session_state.assessment_questions = job.result["questions"]
+                st.session_state.assessment_week = job.result["week"]
+        else:
+            apply_profile_changes(job.result)
+    return job
+def pending_job(action):
+    # Latest job for this action whose result this session has not picked up yet
+    job = get_job_queue().latest(st.session_state.username, action)
+    if job is None or st.session_state.get("applied_jobs", {}).get(action) == job.id:
+        return None
+    return job
+def follow_job(job, placeholder, label, stream=True):
+    # Poll until the job finishes. A rerun (tab switch, another click) only
+    # stops this loop; the job keeps running and is collected on a later run
+    while not job.finished:
+        if job.partial and stream:
+            placeholder.markdown(job.partial + "▌")
+        else:
+            placeholder.caption(f"{label} {job.partial}")
+        job.wait(JOB_POLL_INTERVAL)
+    placeholder.empty()
+    return collect_job(job.action)
+def show_job_error(job):
+    if job is not None and job.status == jobs.FAILED:
+        st.error(f"{JOB_LABELS[job.action]} failed: {job.error}")
 
 
 tab_names = [
@@ -110,6 +309,7 @@ tab_names = [
     "Assessment",
     "Progress Tracker & Dashboard"
 ]
+ADMIN_TAB = "Admin Metrics"
 
 
 if "logged_in" not in st.session_state:
@@ -120,19 +320,49 @@ if "selected_tab" not in st.session_state:
     st.session_state.selected_tab = 0
 
 
+def start_session(username):
+    st.session_state.logged_in = True
+    st.session_state.username = username
+    profile = load_user_profile(username)
+    skill_rows, roadmap_weeks, changes = profile_records(profile)
+    if changes:
+        profile = update_user_profile(username, changes)
+    st.session_state.loaded_profile = profile
+    st.session_state.skills_list = profile.get('skills_list', '')
+    st.session_state.roadmap_text = profile.get('roadmap_text', '')
+    st.session_state.skill_rows = skill_rows
+    st.session_state.roadmap_weeks = roadmap_weeks
+    set_progress(restore_progress(profile))
+    st.session_state.aspirations = profile.get('aspirations', {})
+    st.session_state.profile_analysis = profile.get('profile_analysis', '')
+    # Jobs that finished before this login are already in the profile
+    st.session_state.applied_jobs = {
+        action: job.id for action, job in get_job_queue().user_jobs(username).items() if job.finished
+    }
+
+
+# A browser refresh starts a new session; the signed token in the URL logs it
+# back in without asking for (and re-hashing) the password
+if not st.session_state.logged_in and "session" in st.query_params:
+    token_user = auth.verify_token(st.query_params["session"])
+    if token_user:
+        start_session(token_user)
+    else:
+        del st.query_params["session"]
+
+
 def login_ui():
     st.sidebar.header("Login")
     username = st.sidebar.text_input("Username", key="login_username")
     password = st.sidebar.text_input("Password", type="password", key="login_password")
     if st.sidebar.button("Login"):
-        if authenticate_user(username, password):
-            st.session_state.logged_in = True
-            st.session_state.username = username
+        ok, retry_after = authenticate_user(username, password)
+        if retry_after:
+            st.sidebar.error(f"Too many failed attempts. Try again in {math.ceil(retry_after / 60)} min.")
+        elif ok:
             st.sidebar.success(f"Logged in as {username}")
-            profile = load_user_profile(username)
-            st.session_state.loaded_profile = profile
-            st.session_state.skills_list = profile.get('skills_list', '')
-            st.session_state.roadmap_text = profile.get('roadmap_text', '')
+            start_session(username)
+            st.query_params["session"] = auth.issue_token(username)
             st.rerun()   # single-click login: rerun after setting state [web:12]
         else:
             st.sidebar.error("Invalid username or password")
@@ -151,11 +381,19 @@ def signup_ui():
 
 
 def logout():
+    if st.session_state.username:
+        auth.revoke_tokens(st.session_state.username)
+    if "session" in st.query_params:
+        del st.query_params["session"]
     st.session_state.logged_in = False
     st.session_state.username = ""
     st.session_state.loaded_profile = {}
-    st.session_state.skills_list = ''
-    st.session_state.roadmap_text = ''
+    set_skills_list('')
+    set_roadmap_text('')
+    set_progress(new_progress(''))
+    st.session_state.aspirations = {}
+    st.session_state.profile_analysis = ''
+    st.session_state.assessment_questions = []
 
 
 # Start layout with sidebar
@@ -164,8 +402,10 @@ with st.sidebar:
         # Profile circle icon
         st.markdown(f'<div class="profile-circle">{st.session_state.username[:2].upper()}</div>', unsafe_allow_html=True)
         # Navigation tabs, vertical order
-        selected = st.radio("Navigation", tab_names, index=st.session_state.selected_tab, key="sidebar_nav")
-        st.session_state.selected_tab = tab_names.index(selected)
+        nav_names = tab_names + [ADMIN_TAB] if st.session_state.username in admin_users() else tab_names
+        selected_tab = min(st.session_state.selected_tab, len(nav_names) - 1)
+        selected = st.radio("Navigation", nav_names, index=selected_tab, key="sidebar_nav")
+        st.session_state.selected_tab = nav_names.index(selected)
         st.markdown("---")
         if st.button("Logout"):
             logout()
@@ -197,204 +437,162 @@ if st.session_state.logged_in:
             else:
                 st.session_state[key] = "" if key not in (
                     "assessment_scores", "mastered_skills", "roadmap_skills", "assessment_questions") else ({} if key == "assessment_scores" else [])
+    if "aspirations" not in st.session_state:
+        st.session_state.aspirations = loaded.get("aspirations", {})
+    if "skill_rows" not in st.session_state:
+        st.session_state.skill_rows = parse_skill_rows(st.session_state.skills_list)
+    if "roadmap_weeks" not in st.session_state:
+        st.session_state.roadmap_weeks = parse_roadmap_weeks(st.session_state.roadmap_text)
+    if "progress" not in st.session_state:
+        set_progress(restore_progress({**loaded, 'roadmap_text': st.session_state.roadmap_text}))
 
 
-    def analyze_profile(role, skills, goal):
-        prompt = (
-            f"Analyze the following professional profile:\nCurrent Role: {role}\nCurrent Skills: {skills}\nCareer Goal: {goal}\n\n"
-            "Provide a detailed analysis including strengths, skill gaps, and suggestions."
-        )
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return response.choices[0].message.content.strip()
-    def recommend_skills_plus(role, skills, goal):
-        prompt = (
-            f"Profile:\nRole:{role}\nSkills:{skills}\nGoal:{goal}\n"
-            "List top 5 skills user should learn (each on a new line), with:\n"
-            "Skill name | Brief description | Top verified resource name | Resource link\n"
-            "Example:\nMachine Learning | Fundamentals of ML algorithms | Coursera ML course | https://coursera.org/ml\n"
-            "Give real, reputable resources."
-        )
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return response.choices[0].message.content.strip()
-    def get_roadmap(role, skills, goal, roadmap_skills=None):
-        extra_skill_info = ""
-        if roadmap_skills:
-            extra_skill_info = f"\nSkills chosen for roadmap: {', '.join(roadmap_skills)}"
-        prompt = (
-            f"Profile:\nRole: {role}\nSkills: {skills}\nGoal: {goal}\n"
-            f"{extra_skill_info}\n"
-            "Generate a week-by-week learning roadmap (plain text) to help the user achieve their goal."
-        )
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return response.choices[0].message.content.strip()
-    def parse_roadmap(roadmap_text):
-        roadmap = []
-        for line in roadmap_text.split('\n'):
-            if line.strip().lower().startswith("week"):
-                parts = line.split(":", 1)
-                if len(parts) == 2:
-                    week = parts[0].strip()
-                    task = parts[1].strip()
-                    roadmap.append((week, task))
-        return roadmap
-    def suggest_job_profiles(goal, skills, roadmap_skills=None):
-        skillset = ', '.join(roadmap_skills) if roadmap_skills else ''
-        prompt = f"""Suggest 3-5 concrete job profiles a user can apply for after completing the following career learning plan.
-User goal: {goal}
-User skills: {skills}
-Skills planned: {skillset}
-For each, give:
-- Role title
-- 1-line description matching skillset and goal
-Respond as a markdown unordered list.
-Avoid duplicates. Do not repeat the user's own goal unless it's a stepping-stone variant.
-"""
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return response.choices[0].message.content.strip()
+    def pregenerate_week(weeks, index):
+        # Warm the shared question bank so the assessment is ready when the user gets there
+        if index < len(weeks):
+            question_bank.pregenerate(weeks[index].task)
+    def show_skill_rows(rows):
+        import pandas as pd
+        df = pd.DataFrame([row.to_row() for row in rows], columns=["Skill", "Description", "Top Resource", "Link"])
+        st.dataframe(df, use_container_width=True)
+        for ix, row in enumerate(rows):
+            col1, col2 = st.columns([7, 1])
+            col1.markdown(f"**{row.skill}**: {row.description}\n[{row.resource_name}]({row.resource_link})")
+            if col2.button(f"Add to Roadmap {ix+1}"):
+                if row.skill not in st.session_state.roadmap_skills:
+                    st.session_state.roadmap_skills.append(row.skill)
+                    st.success(f"Added {row.skill} to roadmap!")
+    # Pick up background jobs that finished since the last run
+    for action in JOB_LABELS:
+        show_job_error(collect_job(action))
+
+
+    if st.button("Prepare Everything"):
+        if not role or not goal:
+            st.error("Please enter both your current role and career goal.")
+        else:
+            # Every tab's generation runs in the background. Job suggestions plan
+            # with the chosen roadmap skills, or else with the skills job's result
+            roadmap_skills = list(st.session_state.roadmap_skills)
+            start_job("analysis", job_params(role, skills, goal), analysis_job,
+                      st.session_state.username, role, skills, goal)
+            start_job("skills", job_params(role, skills, goal), skills_job,
+                      st.session_state.username, role, skills, goal, False, not roadmap_skills)
+            start_job("roadmap", job_params(role, skills, goal, roadmap_skills), roadmap_job,
+                      st.session_state.username, role, skills, goal, roadmap_skills)
+            if roadmap_skills:
+                start_job("aspirations", job_params(role, skills, goal, roadmap_skills), aspirations_job,
+                          st.session_state.username, role, skills, goal, roadmap_skills)
+            st.success("Preparing analysis, skills, roadmap and job suggestions in the background. "
+                       "Open each tab to review.")
 
 
     i = st.session_state.selected_tab
     if i == 0:
         st.header("Profile Analyzer")
         def save_profile():
-            profile = load_user_profile(st.session_state.username)
             profile_data = {"role": role, "skills": skills, "goal": goal}
-            profile.update(profile_data)
-            if 'skills_list' in profile:
-                del profile['skills_list']
-            if 'roadmap_text' in profile:
-                del profile['roadmap_text']
-            save_user_profile(st.session_state.username, profile)
+            profile = update_user_profile(st.session_state.username, profile_data,
+                                          remove=('skills_list', 'roadmap_text', 'skill_rows', 'roadmap_weeks', 'progress'))
             st.session_state.loaded_profile = profile
-            st.session_state.skills_list = ''
-            st.session_state.roadmap_text = ''
+            set_skills_list('')
+            set_roadmap_text('')
+            set_progress(new_progress(''))
             st.success("Profile saved successfully!")
         st.button("Save Profile", on_click=save_profile)
-        if st.button("Analyze Profile"):
+        analyze_clicked = st.button("Analyze Profile")
+        regenerate_analysis = st.button("Regenerate Analysis")
+        if analyze_clicked or regenerate_analysis:
             if not role or not goal:
                 st.error("Please enter both your current role and career goal.")
             else:
-                with st.spinner("Analyzing profile..."):
-                    st.session_state.profile_analysis = analyze_profile(role, skills, goal)
-                    st.text_area("Profile Analysis", value=st.session_state.profile_analysis, height=250)
+                start_job("analysis", job_params(role, skills, goal, regenerate=regenerate_analysis), analysis_job,
+                          st.session_state.username, role, skills, goal, regenerate_analysis)
+        job = pending_job("analysis")
+        if job:
+            show_job_error(follow_job(job, st.empty(), "Analyzing profile..."))
+        if st.session_state.profile_analysis:
+            st.text_area("Profile Analysis", value=st.session_state.profile_analysis, height=250)
     elif i == 1:
         st.header("Skill & Resource Recommender")
-        if st.button("Recommend Skills (detailed)"):
+        recommend_clicked = st.button("Recommend Skills (detailed)")
+        regenerate_skills = st.button("Regenerate Recommendations")
+        if recommend_clicked or regenerate_skills:
             if not role or not goal:
                 st.error("Please enter both your current role and career goal.")
             else:
-                with st.spinner("Recommending skills..."):
-                    skills_text = recommend_skills_plus(role, skills, goal)
-                    st.session_state.skills_list = skills_text
-                    profile = load_user_profile(st.session_state.username)
-                    profile['skills_list'] = skills_text
-                    save_user_profile(st.session_state.username, profile)
-                    rows = []
-                    for line in skills_text.split('\n'):
-                        parts = [p.strip() for p in line.split("|")]
-                        if len(parts) == 4:
-                            skill, desc, res_name, res_link = parts
-                            rows.append([skill, desc, res_name, res_link])
-                    if rows:
-                        df = pd.DataFrame(rows, columns=["Skill", "Description", "Top Resource", "Link"])
-                        st.dataframe(df, use_container_width=True)
-                        for ix, (skill, desc, res_name, res_link) in enumerate(rows):
-                            col1, col2 = st.columns([7, 1])
-                            col1.markdown(f"**{skill}**: {desc}\n[{res_name}]({res_link})")
-                            if col2.button(f"Add to Roadmap {ix+1}"):
-                                if skill not in st.session_state.roadmap_skills:
-                                    st.session_state.roadmap_skills.append(skill)
-                                    st.success(f"Added {skill} to roadmap!")
-                    else:
-                        st.info("No structured skills to display.")
-        else:
-            if st.session_state.skills_list:
-                rows = []
-                for line in st.session_state.skills_list.split('\n'):
-                    parts = [p.strip() for p in line.split("|")]
-                    if len(parts) == 4:
-                        skill, desc, res_name, res_link = parts
-                        rows.append([skill, desc, res_name, res_link])
-                if rows:
-                    df = pd.DataFrame(rows, columns=["Skill", "Description", "Top Resource", "Link"])
-                    st.dataframe(df, use_container_width=True)
-                    for ix, (skill, desc, res_name, res_link) in enumerate(rows):
-                        col1, col2 = st.columns([7, 1])
-                        col1.markdown(f"**{skill}**: {desc}\n[{res_name}]({res_link})")
-                        if col2.button(f"Add to Roadmap {ix+1}"):
-                            if skill not in st.session_state.roadmap_skills:
-                                st.session_state.roadmap_skills.append(skill)
-                                st.success(f"Added {skill} to roadmap!")
+                start_job("skills", job_params(role, skills, goal, regenerate=regenerate_skills), skills_job,
+                          st.session_state.username, role, skills, goal, regenerate_skills)
+        job = pending_job("skills")
+        if job:
+            job = follow_job(job, st.empty(), "Recommending skills...")
+            show_job_error(job)
+            if job and job.status == jobs.DONE and not st.session_state.skill_rows:
+                st.info("No structured skills to display.")
+        if st.session_state.skill_rows:
+            show_skill_rows(st.session_state.skill_rows)
     elif i == 2:
         st.header("Learning Roadmap")
-        if st.button("Generate Roadmap"):
+        roadmap_clicked = st.button("Generate Roadmap")
+        regenerate_roadmap = st.button("Regenerate Roadmap")
+        if roadmap_clicked or regenerate_roadmap:
             if not role or not goal:
                 st.error("Please enter both your current role and career goal.")
             else:
-                with st.spinner("Generating roadmap ..."):
-                    roadmap_text = get_roadmap(role, skills, goal, st.session_state.roadmap_skills)
-                    st.session_state.roadmap_text = roadmap_text
-                    profile = load_user_profile(st.session_state.username)
-                    profile['roadmap_text'] = roadmap_text
-                    save_user_profile(st.session_state.username, profile)
-                    st.session_state.current_week_index = 0
-                    st.subheader("Roadmap (week-wise tasks)")
-                    st.text_area("Roadmap", value=roadmap_text, height=300)
-                    roadmap_data = [{"Week": week, "Task": task} for week, task in parse_roadmap(roadmap_text)]
-                    def export_pdf(roadmap_text):
-                        pdf = FPDF()
-                        pdf.add_page()
-                        pdf.set_font("Arial", size=12)
-                        pdf.cell(200, 10, txt="Personalized Learning Roadmap", ln=True, align="C")
-                        pdf.ln(10)
-                        for line in roadmap_text.split('\n'):
-                            pdf.multi_cell(0, 10, txt=line)
-                        filename = "roadmap.pdf"
-                        pdf.output(filename)
-                        return filename
-                    pdf_filename = export_pdf(roadmap_text)
-                    with open(pdf_filename, "rb") as f:
-                        st.download_button(
-                            label="Download roadmap as PDF",
-                            data=f,
-                            file_name=pdf_filename,
-                            mime="application/pdf",
-                        )
-        else:
+                roadmap_skills = list(st.session_state.roadmap_skills)
+                start_job("roadmap", job_params(role, skills, goal, roadmap_skills, regenerate=regenerate_roadmap),
+                          roadmap_job, st.session_state.username, role, skills, goal, roadmap_skills, regenerate_roadmap)
+        job = pending_job("roadmap")
+        if job:
+            st.subheader("Roadmap (week-wise tasks)")
+            show_job_error(follow_job(job, st.empty(), "Generating roadmap ..."))
             if st.session_state.roadmap_text:
-                st.subheader("Roadmap (week-wise tasks)")
                 st.text_area("Roadmap", value=st.session_state.roadmap_text, height=300)
-                roadmap_data = [{"Week": week, "Task": task} for week, task in parse_roadmap(st.session_state.roadmap_text)]
+        elif st.session_state.roadmap_text:
+            st.subheader("Roadmap (week-wise tasks)")
+            st.text_area("Roadmap", value=st.session_state.roadmap_text, height=300)
+        if st.session_state.roadmap_text:
+            pdf_bytes = roadmap_pdf(roadmap_hash(st.session_state.roadmap_text),
+                                    tuple(sorted(st.session_state.assessment_scores.items())),
+                                    st.session_state.roadmap_text, st.session_state.roadmap_weeks)
+            st.download_button(
+                label="Download roadmap as PDF",
+                data=pdf_bytes,
+                file_name="roadmap.pdf",
+                mime="application/pdf",
+            )
         st.markdown("### Career Aspirations")
         if not role or not goal or not st.session_state.skills_list:
             st.info("Save your profile and generate recommended skills for personalized job suggestions.")
         else:
-            with st.spinner("Generating job profile suggestions..."):
-                recommended_skills = []
-                for line in st.session_state.skills_list.split('\n'):
-                    parts = [p.strip() for p in line.split("|")]
-                    if len(parts) == 4:
-                        skill, desc, res_name, res_link = parts
-                        recommended_skills.append(skill)
-                skills_for_aspirations = st.session_state.roadmap_skills if st.session_state.roadmap_skills else recommended_skills
-                aspirations_markdown = suggest_job_profiles(goal, skills, skills_for_aspirations)
-                st.markdown(aspirations_markdown)
+            recommended_skills = [row.skill for row in st.session_state.skill_rows]
+            skills_for_aspirations = st.session_state.roadmap_skills if st.session_state.roadmap_skills else recommended_skills
+            # Only recompute when goal, skills or the chosen roadmap skills change
+            current_key = aspirations_key(goal, skills, skills_for_aspirations)
+            planned = list(skills_for_aspirations)
+            params = job_params(role, skills, goal, planned)
+            job = get_job_queue().latest(st.session_state.username, "aspirations")
+            tried = job is not None and job.key == jobs.job_key(params)
+            if st.session_state.aspirations.get("key") != current_key and not tried:
+                # Keep showing the previous suggestions while the new ones are generated
+                job = start_job("aspirations", params, aspirations_job,
+                                st.session_state.username, role, skills, goal, planned)
+            if not st.session_state.aspirations.get("markdown") and pending_job("aspirations"):
+                with st.spinner("Generating job profile suggestions..."):
+                    show_job_error(follow_job(job, st.empty(), "", stream=False))
+            elif tried:
+                show_job_error(job)
+            if st.session_state.aspirations.get("markdown"):
+                st.markdown(st.session_state.aspirations["markdown"])
+            if st.button("Refresh Suggestions"):
+                job = start_job("aspirations", job_params(role, skills, goal, planned, regenerate=True),
+                                aspirations_job, st.session_state.username, role, skills, goal, planned, True)
+            if job and not job.finished:
+                st.caption("Updating suggestions in the background; they will appear on your next interaction.")
     elif i == 3:
         # ASSESSMENT TAB ONLY
         st.header("Assessment")
-        roadmap_tasks = parse_roadmap(st.session_state.get("roadmap_text", ""))
+        roadmap_tasks = st.session_state.roadmap_weeks
         if not roadmap_tasks:
             st.info("Generate your roadmap first to begin assessments.")
         else:
@@ -402,40 +600,37 @@ Avoid duplicates. Do not repeat the user's own goal unless it's a stepping-stone
             if current_idx >= len(roadmap_tasks):
                 st.success("Congrats! You completed all weeks.")
             else:
-                current_week, current_task = roadmap_tasks[current_idx]
+                current_week, current_task = roadmap_tasks[current_idx].week, roadmap_tasks[current_idx].task
                 prev_pass = True
                 if current_idx > 0:
-                    prev_week = roadmap_tasks[current_idx - 1][0]
-                    prev_score = st.session_state.assessment_scores.get(prev_week, 0)
-                    if prev_score < 70:
+                    prev_week = roadmap_tasks[current_idx - 1].week
+                    if prev_week not in st.session_state.mastered_skills:
                         st.warning(f"Pass previous week ({prev_week}) assessment to continue.")
                         prev_pass = False
+                if prev_pass and st.session_state.get("assessment_week") != current_week:
+                    # Questions for this week may already be in the bank (pre-generated,
+                    # or generated for another user with the same task)
+                    banked = question_bank.lookup(current_task)
+                    if banked:
+                        st.session_state.assessment_questions = banked
+                        st.session_state.assessment_week = current_week
                 if prev_pass:
-                    if st.button(f"Generate 20 MCQs for {current_week}"):
-                        with st.spinner(f"Generating MCQs for {current_week}..."):
-                            prompt = f"""For this task generate 20 multiple-choice questions.
-Respond as JSON list with objects containing: "question" (str), "options" (list of 4 strings), and "answer" (correct option text).
-Task description: {current_task}
-"""
-                            response = client.chat.completions.create(
-                                model="llama-3.3-70b-versatile",
-                                messages=[{"role": "user", "content": prompt}]
-                            )
-                            raw_text = response.choices[0].message.content
-                            json_matches = re.findall(r'\[.*\]', raw_text, re.DOTALL)
-                            if json_matches:
-                                json_str = json_matches[0]
-                                try:
-                                    questions = json.loads(json_str)
-                                except Exception as e:
-                                    st.error(f"JSON parsing error: {str(e)}. Try regenerating.")
-                                    questions = []
+                    generate_clicked = st.button(f"Generate 20 MCQs for {current_week}")
+                    regenerate_mcqs = st.button(f"Regenerate MCQs for {current_week}")
+                    if generate_clicked or regenerate_mcqs:
+                        start_job("mcqs", job_params(current_task, regenerate=regenerate_mcqs), mcq_job,
+                                  current_week, current_task, regenerate_mcqs)
+                    job = pending_job("mcqs")
+                    if job:
+                        job = follow_job(job, st.empty(), f"Generating MCQs for {current_week}...", stream=False)
+                        show_job_error(job)
+                        if job and job.status == jobs.DONE:
+                            for error in job.result["errors"]:
+                                st.warning(error)
+                            if job.result["questions"]:
+                                st.success(f"{len(job.result['questions'])} MCQs generated for week {job.result['week']}")
                             else:
-                                st.error("No valid JSON found in response. Try regenerating.")
-                                questions = []
-                            st.session_state.assessment_questions = questions
-                            st.session_state.assessment_week = current_week
-                            st.success(f"MCQs generated for week {current_week}")
+                                st.error("No valid questions were generated. Try regenerating.")
                     if (
                         "assessment_questions" in st.session_state 
                         and st.session_state.assessment_questions 
@@ -452,77 +647,138 @@ Task description: {current_task}
                                 )
                             submitted = st.form_submit_button("Submit Assessment")
                         if submitted:
-                            scores = st.session_state.assessment_scores
-                            correct_count = 0
-                            for ix, q in enumerate(st.session_state.assessment_questions):
-                                ans = user_answers.get(ix, "")
-                                correct = (ans == q["answer"])
-                                score = 100 if correct else 40
-                                week = st.session_state.assessment_week
-                                scores[week] = scores.get(week, 0) + score / len(st.session_state.assessment_questions)
-                                if correct:
-                                    correct_count += 1
-                            final_score = int(scores[week])
-                            st.session_state.assessment_scores = scores
-                            if final_score >= 70:
-                                st.success(f"Passed week {current_week} assessment with score {final_score}! ({correct_count}/20 correct)")
+                            week = st.session_state.assessment_week
+                            questions = st.session_state.assessment_questions
+                            # One attempt is graded on its own; the week's score then follows
+                            # the grading policy (latest or best attempt), never a running sum
+                            score, correct = grade(questions, user_answers)
+                            attempts = st.session_state.progress.setdefault("attempts", {}).setdefault(week, [])
+                            attempts.append(attempt_record(score, correct))
+                            final_score = week_score(attempts)
+                            passed = record_score(st.session_state.assessment_scores, st.session_state.mastered_skills,
+                                                  week, final_score, POLICY.pass_mark)
+                            question_bank.record_answers(current_task, questions, correct)
+                            correct_count = int(correct.sum())
+                            if passed:
+                                st.success(f"Passed week {current_week} assessment with score {final_score:.0f}! ({correct_count}/{len(questions)} correct)")
                                 st.session_state.current_week_index += 1
                                 st.session_state.assessment_questions = []
+                                pregenerate_week(roadmap_tasks, st.session_state.current_week_index)
                             else:
-                                st.error(f"Failed week {current_week} assessment with score {final_score}. Try again.")
-                            for ix, q in enumerate(st.session_state.assessment_questions):
-                                st.markdown(f"**Q{ix+1}: {q['question']}**")
-                                st.markdown(f"Your answer: {user_answers.get(ix, '')}")
-                                st.markdown(f"Correct answer: {q['answer']}")
-                                if user_answers.get(ix, "") == q["answer"]:
-                                    st.success("Correct")
-                                else:
-                                    st.error("Incorrect")
+                                st.error(f"Failed week {current_week} assessment with score {final_score:.0f}. Try again.")
+                                # No answer key on a failed attempt, and the retry gets the set in a new
+                                # order; otherwise resubmitting the answers shown here always passes
+                                st.session_state.assessment_questions = shuffled(questions)
+                            save_progress()
+                            if passed:
+                                for ix, q in enumerate(questions):
+                                    st.markdown(f"**Q{ix+1}: {q['question']}**")
+                                    st.markdown(f"Your answer: {user_answers.get(ix, '')}")
+                                    st.markdown(f"Correct answer: {q['answer']}")
+                                    if correct[ix]:
+                                        st.success("Correct")
+                                    else:
+                                        st.error("Incorrect")
     elif i == 4:
         # PROGRESS TRACKER & DASHBOARD TAB ONLY
         st.header("Progress Tracker & Dashboard")
-        roadmap_tasks = parse_roadmap(st.session_state.get("roadmap_text", ""))
-        assessment_scores = st.session_state.get("assessment_scores", {})
-        progress_data = []
-        mastered_skills = st.session_state.get("mastered_skills", [])
-        passed_weeks = 0
-        for week, task in roadmap_tasks:
-            score = assessment_scores.get(week, 0)
-            status = "Pass" if score >= 70 else "Fail"
-            if status == "Pass":
-                if week not in mastered_skills:
-                    mastered_skills.append(week)
-                passed_weeks += 1
-            progress_data.append([week, task, score, status])
-        st.session_state.mastered_skills = mastered_skills
-        total_weeks = len(progress_data)
+        roadmap_weeks = st.session_state.roadmap_weeks
+        mastered_skills = st.session_state.mastered_skills
+        total_weeks = len(roadmap_weeks)
+        passed_weeks = len(mastered_skills)
         percent_complete = math.floor(passed_weeks / total_weeks * 100) if total_weeks else 0
         st.markdown(f"**Progress:** {passed_weeks} / {total_weeks} weeks passed")
         st.progress(percent_complete / 100)
         st.markdown(f"**{percent_complete}% of roadmap passed**")
-        df_progress = pd.DataFrame(progress_data, columns=["Week", "Task", "Score", "Status"])
+        df_progress, fig, mastered, upcoming = dashboard_view(
+            st.session_state.progress["roadmap"],
+            tuple(sorted(st.session_state.assessment_scores.items())),
+            tuple(sorted(mastered_skills)),
+            roadmap_weeks,
+        )
         st.markdown("### Weekly Assessment Summary")
         st.dataframe(df_progress, use_container_width=True)
         st.subheader("Weekly Score Trend")
-        scores = [assessment_scores.get(week, 0) for week, _ in roadmap_tasks]
-        if scores:
-            fig = px.line(x=[week for week, _ in roadmap_tasks], y=scores, markers=True, labels={'x': 'Week', 'y': 'Score'})
+        if fig is not None:
             st.plotly_chart(fig, use_container_width=True)
         else:
             st.info("Assessment scores not available. Complete assessments first.")
         st.subheader("Skills Mastered")
-        mastered = [roadmap_tasks[ix][1] for ix, score in enumerate(scores) if score >= 70]
         if mastered:
             st.write(", ".join(mastered))
         else:
             st.write("No skills mastered yet.")
         st.subheader("Upcoming Assessments")
-        week_statuses = [(week, score) for (week, _), score in zip(roadmap_tasks, scores)]
-        upcoming = [week for week, score in week_statuses if score < 70]
         if upcoming:
             st.write(", ".join(upcoming))
         else:
             st.write("No upcoming assessments. All passed.")
+    elif i == len(tab_names) and st.session_state.username in admin_users():
+        # ADMIN: LLM LATENCY, TOKENS AND CACHE BEHAVIOUR FOR THIS PROCESS
+        import pandas as pd
+        st.header(ADMIN_TAB)
+        summary = metrics.registry.summary()
+        if summary:
+            st.subheader("LLM calls per prompt site")
+            st.dataframe(pd.DataFrame(summary).set_index("site"), use_container_width=True)
+        else:
+            st.info("No LLM calls recorded since this process started.")
+        st.markdown(f"Requests coalesced with an identical in-flight call: {llm.flights.coalesced}")
+        cache_stats = llm.cache.stats()
+        if cache_stats:
+            st.subheader("Response cache")
+            st.dataframe(pd.DataFrame.from_dict(cache_stats, orient="index"), use_container_width=True)
+        st.subheader("Near-duplicate profile cache")
+        # Any SEMANTIC_CACHE_THRESHOLD above 1 means off, which 1.01 keeps
+        similar_profiles.threshold = st.slider(
+            "Similarity threshold (minimum per-field Jaccard; above 1 disables)",
+            0.0, 1.01, min(max(float(similar_profiles.threshold), 0.0), 1.01), 0.01, key="similar_threshold",
+        )
+        similar_stats = similar_profiles.stats()
+        if similar_stats:
+            st.dataframe(pd.DataFrame.from_dict(similar_stats, orient="index"), use_container_width=True)
+        job_counts = get_job_queue().counts()
+        if job_counts:
+            st.subheader("Background jobs")
+            st.dataframe(pd.DataFrame(job_counts, columns=["Action", "Status", "Jobs", "Mean run time (s)"]),
+                         use_container_width=True)
+        weak = question_bank.question_stats()
+        if weak:
+            st.subheader("Questions with the lowest correct rate")
+            st.dataframe(pd.DataFrame(weak, columns=["Question", "Answer", "Attempts", "Correct", "Rate"]),
+                         use_container_width=True)
+        st.subheader("Cohorts")
+        st.caption(f"Exports every stored profile to {COHORT_EXPORT_PATH}; `python cohorts.py` does the same "
+                   "from the command line and imports exports back.")
+        if st.button("Export profiles and run cohort report"):
+            import cohorts
+            with st.spinner("Exporting profiles..."):
+                exported = cohorts.export_profiles(COHORT_EXPORT_PATH)
+                st.session_state.cohort_report = cohorts.cohort_report(COHORT_EXPORT_PATH)
+            st.caption(f"Exported {exported} users")
+        for name, table in st.session_state.get("cohort_report", {}).items():
+            st.markdown(f"**{name.replace('_', ' ').capitalize()}**")
+            st.dataframe(table, use_container_width=True, hide_index=True)
+        st.subheader("Startup")
+        st.dataframe(pd.DataFrame(list(diagnostics.marks().items()), columns=["Event", "Seconds after process start"]),
+                     use_container_width=True)
+        st.markdown("Heavy modules loaded in this process: " + ", ".join(
+            f"{name} {'yes' if loaded else 'no'}" for name, loaded in diagnostics.loaded_heavy_modules().items()))
+        if st.button("Profile imports (-X importtime)"):
+            with st.spinner("Importing the app's modules in a fresh interpreter..."):
+                rows, total = diagnostics.import_profile()
+            st.dataframe(pd.DataFrame([("  " * depth + name, self_ms, cumulative_ms)
+                                       for name, self_ms, cumulative_ms, depth in rows],
+                                      columns=["Module", "Self (ms)", "Cumulative (ms)"]),
+                         use_container_width=True)
+            st.caption(f"Interpreter start plus imports took {total:.2f}s")
+        exposition = metrics.registry.prometheus()
+        with st.expander("Prometheus exposition"):
+            st.code(exposition, language="text")
+        st.download_button("Download metrics", exposition, file_name="metrics.prom", mime="text/plain")
 
 
     st.markdown('</div>', unsafe_allow_html=True)
+
+
+diagnostics.mark("first script run finished")
@@ -0,0 +1,225 @@
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from user_store import get_store
+
+
+# "scrypt" or "pbkdf2_sha256"; changing it (or the cost below) rehashes each
+# user on their next successful login
+AUTH_KDF = os.getenv("AUTH_KDF", "scrypt")
+AUTH_SCRYPT_N = int(os.getenv("AUTH_SCRYPT_N", str(2 ** 14)))
+AUTH_SCRYPT_R = int(os.getenv("AUTH_SCRYPT_R", "8"))
+AUTH_SCRYPT_P = int(os.getenv("AUTH_SCRYPT_P", "1"))
+AUTH_PBKDF2_ITERATIONS = int(os.getenv("AUTH_PBKDF2_ITERATIONS", "600000"))
+# KDF runs are CPU/memory heavy (16 MB each for the default scrypt cost); at
+# most this many run at once per process
+AUTH_KDF_WORKERS = int(os.getenv("AUTH_KDF_WORKERS", "4"))
+
+# Session tokens are signed with AUTH_SECRET. Without it a random per-process
+# secret is used, so tokens do not survive a restart or work across replicas.
+# They travel in the URL, so they are short-lived and revoked on logout
+AUTH_SECRET = os.getenv("AUTH_SECRET", "").encode() or secrets.token_bytes(32)
+AUTH_SESSION_TTL = int(os.getenv("AUTH_SESSION_TTL", str(8 * 60 * 60)))
+
+# Failed logins per username before it is throttled, and over how long
+AUTH_MAX_FAILURES = int(os.getenv("AUTH_MAX_FAILURES", "5"))
+AUTH_FAILURE_WINDOW = int(os.getenv("AUTH_FAILURE_WINDOW", "900"))
+AUTH_FAILURE_TRACKED = 10000
+
+# Recently verified (username, password) pairs skip the KDF for a while
+AUTH_VERIFY_CACHE_TTL = int(os.getenv("AUTH_VERIFY_CACHE_TTL", "300"))
+AUTH_VERIFY_CACHE_SIZE = 1024
+
+_kdf_pool = ThreadPoolExecutor(max_workers=AUTH_KDF_WORKERS, thread_name_prefix="kdf")
+_cache_key = secrets.token_bytes(32)
+_verified = OrderedDict()
+_failures = {}
+_lock = threading.Lock()
+
+
+def _b64(raw):
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _derive(password, kdf, params, salt):
+    if kdf == "scrypt":
+        n, r, p = params
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r * p)
+    return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, params[0])
+
+
+def _current_params():
+    if AUTH_KDF == "scrypt":
+        return "scrypt", (AUTH_SCRYPT_N, AUTH_SCRYPT_R, AUTH_SCRYPT_P)
+    return "pbkdf2_sha256", (AUTH_PBKDF2_ITERATIONS,)
+
+
+def hash_password(password):
+    # "<kdf>$<cost,...>$<salt>$<hash>"
+    kdf, params = _current_params()
+    salt = secrets.token_bytes(16)
+    derived = _kdf_pool.submit(_derive, password, kdf, params, salt).result()
+    return f"{kdf}${','.join(map(str, params))}${_b64(salt)}${_b64(derived)}"
+
+
+def _is_legacy(stored):
+    # The original unsalted hex SHA-256
+    return len(stored) == 64 and "$" not in stored
+
+
+def verify_password(password, stored):
+    """Check ``password`` against a stored hash; returns (ok, needs_rehash)."""
+    if _is_legacy(stored):
+        ok = hmac.compare_digest(stored, hashlib.sha256(password.encode()).hexdigest())
+        return ok, ok
+    try:
+        kdf, params, salt, expected = stored.split("$")
+        params = tuple(int(x) for x in params.split(","))
+        salt, expected = _unb64(salt), _unb64(expected)
+    except ValueError:
+        return False, False
+    derived = _kdf_pool.submit(_derive, password, kdf, params, salt).result()
+    ok = hmac.compare_digest(derived, expected)
+    return ok, ok and (kdf, params) != _current_params()
+
+
+# Unknown usernames are checked against this so they take as long as real ones
+_DUMMY_HASH = None
+
+
+def _dummy_hash():
+    global _DUMMY_HASH
+    if _DUMMY_HASH is None:
+        _DUMMY_HASH = hash_password(secrets.token_hex(8))
+    return _DUMMY_HASH
+
+
+def throttled_for(username):
+    # Seconds until ``username`` may try again; 0 when not throttled
+    now = time.time()
+    with _lock:
+        failures = _failures.get(username)
+        if not failures:
+            return 0
+        while failures and failures[0] <= now - AUTH_FAILURE_WINDOW:
+            failures.popleft()
+        if not failures:
+            del _failures[username]
+            return 0
+        if len(failures) < AUTH_MAX_FAILURES:
+            return 0
+        return failures[0] + AUTH_FAILURE_WINDOW - now
+
+
+def _record_failure(username):
+    with _lock:
+        if username not in _failures and len(_failures) >= AUTH_FAILURE_TRACKED:
+            # Bound memory under username spraying; forget the oldest entry
+            _failures.pop(next(iter(_failures)))
+        _failures.setdefault(username, deque(maxlen=AUTH_MAX_FAILURES)).append(time.time())
+
+
+def _verification_key(username, stored, password):
+    return hmac.new(_cache_key, f"{username}\0{stored}\0{password}".encode(), hashlib.sha256).digest()
+
+
+def authenticate(username, password):
+    """Check a login; returns (ok, retry_after).
+
+    ``retry_after`` is non-zero when the username has too many recent
+    failures, in which case the password is not checked at all. Legacy or
+    outdated hashes are replaced after a successful check.
+    """
+    retry_after = throttled_for(username)
+    if retry_after:
+        return False, retry_after
+    store = get_store()
+    stored = store.get_password(username)
+    if stored is None:
+        verify_password(password, _dummy_hash())
+        _record_failure(username)
+        return False, 0
+    key = _verification_key(username, stored, password)
+    now = time.time()
+    with _lock:
+        verified_at = _verified.get(key)
+        if verified_at is not None and verified_at > now - AUTH_VERIFY_CACHE_TTL:
+            _verified.move_to_end(key)
+            _failures.pop(username, None)
+            return True, 0
+    ok, needs_rehash = verify_password(password, stored)
+    if not ok:
+        _record_failure(username)
+        return False, 0
+    if needs_rehash:
+        stored = hash_password(password)
+        store.set_password(username, stored)
+        key = _verification_key(username, stored, password)
+    with _lock:
+        _failures.pop(username, None)
+        _verified[key] = now
+        _verified.move_to_end(key)
+        while len(_verified) > AUTH_VERIFY_CACHE_SIZE:
+            _verified.popitem(last=False)
+    return True, 0
+
+
+def register(username, password, profile=None):
+    return get_store().create_user(username, hash_password(password), profile)
+
+
+def _fingerprint(stored):
+    # Ties a token to the password it was issued for; changing it revokes the token
+    return hmac.new(AUTH_SECRET, stored.encode(), hashlib.sha256).hexdigest()[:16]
+
+
+def issue_token(username, ttl=AUTH_SESSION_TTL):
+    store = get_store()
+    stored = store.get_password(username) or ""
+    generation = store.token_generation(username) or 0
+    payload = f"{username}|{int(time.time() + ttl)}|{_fingerprint(stored)}|{generation}"
+    signature = hmac.new(AUTH_SECRET, payload.encode(), hashlib.sha256).digest()
+    return f"{_b64(payload.encode())}.{_b64(signature)}"
+
+
+def verify_token(token):
+    """Username for a valid, unexpired session token, else None."""
+    try:
+        payload, signature = token.split(".")
+        payload = _unb64(payload)
+        signature = _unb64(signature)
+    except ValueError:
+        return None
+    if not hmac.compare_digest(signature, hmac.new(AUTH_SECRET, payload, hashlib.sha256).digest()):
+        return None
+    try:
+        username, expires_at, fingerprint, generation = payload.decode().rsplit("|", 3)
+        expires_at, generation = int(expires_at), int(generation)
+    except ValueError:
+        return None
+    if expires_at < time.time():
+        return None
+    store = get_store()
+    stored = store.get_password(username)
+    if stored is None or not hmac.compare_digest(fingerprint, _fingerprint(stored)):
+        return None
+    if generation != store.token_generation(username):
+        return None
+    return username
+
+
+def revoke_tokens(username):
+    # Logout: every token issued to ``username`` so far stops working, including
+    # copies of the URL left in history or shared links
+    get_store().bump_token_generation(username)
@@ -0,0 +1,228 @@
+"""Local stand-in for the Groq chat completions API.
+
+Run it and point the app (or the benchmark) at it:
+
+    python bench/fake_groq.py --port 8765 --latency 0.5 --tokens-per-second 200
+    GROQ_BASE_URL=http://127.0.0.1:8765 GROQ_API_KEY=fake streamlit run app.py
+
+Replies are canned but shaped like the real prompts expect (pipe-separated
+skill rows, "Week N:" roadmap lines, MCQ JSON), so the whole UI works offline.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeConfig:
+    def __init__(self, latency=0.2, tokens_per_second=300.0, error_rate=0.0, error_status=429):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_status = error_status
+
+
+class FakeStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.by_prompt = {}
+        self.completion_tokens = 0
+
+    def record(self, prompt, tokens=0, error=False):
+        with self._lock:
+            self.requests += 1
+            self.errors += int(error)
+            self.completion_tokens += tokens
+            self.by_prompt[prompt] = self.by_prompt.get(prompt, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "completion_tokens": self.completion_tokens,
+                "distinct_prompts": len(self.by_prompt),
+                "max_requests_per_prompt": max(self.by_prompt.values(), default=0),
+            }
+
+
+def _mcqs(count):
+    # Question text is unique per reply so the app's de-duplication keeps every set full
+    reply_id = uuid.uuid4().hex[:6]
+    questions = []
+    for n in range(count):
+        options = [f"Option {letter} for question {n + 1}" for letter in "ABCD"]
+        questions.append({
+            "question": f"Sample question {n + 1} ({reply_id})?",
+            "options": options,
+            "answer": options[n % 4],
+        })
+    return json.dumps(questions, indent=2)
+
+
+def fake_reply(prompt):
+    if "multiple-choice" in prompt:
+        count = 5
+        for word in prompt.split():
+            if word.isdigit():
+                count = int(word)
+                break
+        return "Here are your questions:\n" + _mcqs(count)
+    if "Skill name |" in prompt:
+        return "\n".join(
+            f"Skill {n} | What skill {n} covers | Course {n} | https://example.com/course-{n}"
+            for n in range(1, 6)
+        )
+    if "week-by-week" in prompt:
+        return "\n".join(f"Week {n}: Study topic {n} and build a small project" for n in range(1, 9))
+    if "job profiles" in prompt:
+        return "\n".join(f"- **Role {n}**: a role that fits the plan" for n in range(1, 5))
+    return " ".join(random.choice(["career", "skills", "growth", "learning", "goal", "plan"]) for _ in range(120))
+
+
+def _tokens(text):
+    # Roughly one token per word-piece; good enough for pacing
+    return text.replace("\n", " \n").split(" ")
+
+
+def make_handler(config, stats):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                self._json(200, stats.snapshot())
+            else:
+                self._json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            if not self.path.endswith("/chat/completions"):
+                self._json(404, {"error": {"message": "not found"}})
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            messages = request.get("messages", [])
+            prompt = messages[0].get("content", "") if messages else ""
+            if random.random() < config.error_rate:
+                stats.record(prompt, error=True)
+                self._json(
+                    config.error_status,
+                    {"error": {"message": "fake upstream error", "type": "fake"}},
+                    {"retry-after": "0.1"} if config.error_status == 429 else None,
+                )
+                return
+            reply = fake_reply(prompt)
+            tokens = _tokens(reply)
+            for message in messages:
+                if message.get("role") == "assistant":
+                    # A continuation: send the rest of the same reply
+                    tokens = [""] + tokens[len(_tokens(message.get("content", ""))):]
+            limit = request.get("max_tokens")
+            finish_reason = "length" if limit and len(tokens) > limit else "stop"
+            if limit:
+                tokens = tokens[:limit]
+            stats.record(prompt, len(tokens))
+            usage = {
+                "prompt_tokens": len(prompt) // 4,
+                "completion_tokens": len(tokens),
+                "total_tokens": len(prompt) // 4 + len(tokens),
+            }
+            time.sleep(config.latency)
+            if request.get("stream"):
+                self._stream(request, tokens, usage, finish_reason)
+            else:
+                time.sleep(len(tokens) / config.tokens_per_second)
+                self._json(200, {
+                    "id": f"chatcmpl-{uuid.uuid4().hex}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": " ".join(tokens).replace(" \n", "\n")},
+                        "finish_reason": finish_reason,
+                    }],
+                    "usage": usage,
+                })
+
+        def _stream(self, request, tokens, usage, finish_reason="stop"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            chunk_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+            def send(payload):
+                data = f"data: {payload}\n\n".encode()
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            for ix, token in enumerate(tokens):
+                time.sleep(1 / config.tokens_per_second)
+                piece = token if ix == 0 or token.startswith("\n") else " " + token
+                send(json.dumps({
+                    "id": chunk_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": request.get("model"),
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                }))
+            send(json.dumps({
+                "id": chunk_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model"),
+                "choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}],
+                "x_groq": {"id": chunk_id, "usage": usage},
+            }))
+            send("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def start_server(port=0, config=None):
+    # Runs in a daemon thread; returns (server, stats). server.server_address
+    # holds the bound port when port=0
+    stats = FakeStats()
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(config or FakeConfig(), stats))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=300.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=429)
+    args = parser.parse_args()
+    config = FakeConfig(args.latency, args.tokens_per_second, args.error_rate, args.error_status)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(config, FakeStats()))
+    print(f"Fake Groq listening on http://127.0.0.1:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
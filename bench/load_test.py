@@ -0,0 +1,291 @@
+"""Offline load test for the career coach against bench/fake_groq.py.
+
+Simulates users walking through the tabs and reports throughput, per-tab
+latency percentiles, upstream LLM calls per action and storage I/O.
+
+    python bench/load_test.py --users 50 --concurrency 50
+    python bench/load_test.py --users 500 --concurrency 100 --distinct-profiles 20 --latency 0.5
+    python bench/load_test.py --mode apptest --users 5
+
+``logic`` mode (default) drives the same coach / question bank / user store
+functions app.py calls, from one thread per concurrent user. ``apptest``
+mode runs the real script through Streamlit's AppTest, one user at a time,
+so the numbers include rerun cost. Everything runs in a scratch directory
+(--workdir) with its own user store, response cache and question bank.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from fake_groq import FakeConfig, start_server
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TABS = [
+    "Login",
+    "Profile Analyzer",
+    "Skill & Resource Recommender",
+    "Learning Roadmap",
+    "Assessment",
+    "Progress Tracker & Dashboard",
+]
+# Prompt sites each tab calls in logic mode
+TAB_SITES = {
+    "Profile Analyzer": ["analyze_profile"],
+    "Skill & Resource Recommender": ["recommend_skills_plus"],
+    "Learning Roadmap": ["get_roadmap", "suggest_job_profiles"],
+    "Assessment": ["generate_mcqs"],
+}
+STORE_FILES = ["users.db", "users.db-wal", "llm_cache.db", "question_bank.db", "question_bank.db-wal"]
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.timings = {}
+        self.upstream = {}
+        self.failures = {}
+
+    def time(self, tab, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        except Exception as e:
+            with self._lock:
+                self.failures[tab] = self.failures.get(tab, 0) + 1
+            print(f"{tab}: {type(e).__name__}: {e}", file=sys.stderr)
+        finally:
+            with self._lock:
+                self.timings.setdefault(tab, []).append(time.perf_counter() - start)
+
+    def add_upstream(self, tab, requests):
+        with self._lock:
+            self.upstream[tab] = self.upstream.get(tab, 0) + requests
+
+
+def io_counters():
+    # Bytes this process read/wrote through the block layer (Linux only)
+    counters = {}
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                counters[name] = int(value)
+    except OSError:
+        pass
+    return counters
+
+
+def profile_inputs(user, distinct_profiles):
+    n = user % distinct_profiles
+    return f"Data analyst {n}", f"sql, excel, python, skill{n}", f"Data scientist {n}"
+
+
+def logic_user(user, args, recorder):
+    # Mirrors the calls app.py makes for one user going through every tab
+    import auth
+    from coach import analyze_profile, get_roadmap, recommend_skills_plus, recommended_skill_names, suggest_job_profiles
+    from grading import attempt_record, grade
+    from models import parse_roadmap_weeks, parse_skill_rows, roadmap_record_fields, skill_record_fields
+    from progress import new_progress, record_score, restore_progress
+    import question_bank
+    from user_store import get_store
+
+    store = get_store()
+    username = f"user{user}"
+    role, skills, goal = profile_inputs(user, args.distinct_profiles)
+    state = {}
+
+    def login():
+        auth.register(username, "password")
+        auth.authenticate(username, "password")
+        state["profile"] = store.get_profile(username)
+        state["progress"] = restore_progress(state["profile"])
+
+    def analyze():
+        store.replace_profile(username, {"role": role, "skills": skills, "goal": goal})
+        analyze_profile(role, skills, goal)
+
+    def recommend():
+        skills_text = recommend_skills_plus(role, skills, goal)
+        rows = parse_skill_rows(skills_text)
+        store.update_profile(username, {"skills_list": skills_text, **skill_record_fields(rows)})
+        state["roadmap_skills"] = recommended_skill_names(skills_text)
+
+    def roadmap():
+        roadmap_text = get_roadmap(role, skills, goal, state.get("roadmap_skills"))
+        state["weeks"] = parse_roadmap_weeks(roadmap_text)
+        state["progress"] = new_progress(roadmap_text)
+        store.update_profile(username, {"roadmap_text": roadmap_text, **roadmap_record_fields(state["weeks"]),
+                                        "progress": state["progress"]})
+        # Career Aspirations sits on the Learning Roadmap tab
+        suggest_job_profiles(goal, skills, state.get("roadmap_skills"))
+
+    def assessment():
+        if not state.get("weeks"):
+            return
+        week = state["weeks"][0]
+        questions, _ = question_bank.get_or_generate(week.task)
+        answers = {ix: q["options"][(user + ix) % 4] for ix, q in enumerate(questions)}
+        score, correct = grade(questions, answers)
+        progress = state["progress"]
+        progress["attempts"].setdefault(week.week, []).append(attempt_record(score, correct))
+        mastered = set(progress["mastered"])
+        record_score(progress["scores"], mastered, week.week, score)
+        progress["mastered"] = sorted(mastered)
+        question_bank.record_answers(week.task, questions, correct)
+        store.update_profile(username, {"progress": progress})
+
+    def dashboard():
+        profile = store.get_profile(username)
+        restore_progress(profile)
+
+    for tab, fn in zip(TABS, [login, analyze, recommend, roadmap, assessment, dashboard]):
+        recorder.time(tab, fn)
+
+
+def run_logic(args, recorder):
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for future in [pool.submit(logic_user, user, args, recorder) for user in range(args.users)]:
+            future.result()
+    # Upstream requests per tab from the per-site LLM metrics
+    import metrics
+    sites = {row["site"]: row for row in metrics.registry.summary()}
+    for tab, tab_sites in TAB_SITES.items():
+        for site in tab_sites:
+            row = sites.get(site)
+            if row:
+                recorder.add_upstream(tab, row["calls"] - row["cache_hits"] - row["coalesced"] - row["errors"])
+
+
+def run_apptest(args, recorder, fake_stats):
+    from streamlit.testing.v1 import AppTest
+
+    def counted(tab, at, action):
+        before = fake_stats.snapshot()["requests"]
+        recorder.time(tab, action)
+        recorder.add_upstream(tab, fake_stats.snapshot()["requests"] - before)
+        if at.exception:
+            raise RuntimeError(f"{tab}: {[e.value for e in at.exception]}")
+
+    def click(at, label):
+        for button in at.button:
+            if button.label == label:
+                button.click().run()
+                return
+
+    def tab(at, name):
+        at.sidebar.radio(key="sidebar_nav").set_value(name).run()
+
+    for user in range(args.users):
+        role, skills, goal = profile_inputs(user, args.distinct_profiles)
+        username = f"user{user}"
+        at = AppTest.from_file(os.path.join(os.getcwd(), "app.py"), default_timeout=args.timeout).run()
+        at.sidebar.text_input(key="signup_username").input(username)
+        at.sidebar.text_input(key="signup_password").input("password")
+        at.sidebar.button[1].click().run()
+        at.sidebar.text_input(key="login_username").input(username)
+        at.sidebar.text_input(key="login_password").input("password")
+        counted("Login", at, lambda: at.sidebar.button[0].click().run())
+        at.text_input(key="main_role").input(role)
+        at.text_area(key="main_skills").input(skills)
+        at.text_input(key="main_goal").input(goal).run()
+        click(at, "Save Profile")
+        counted("Profile Analyzer", at, lambda: click(at, "Analyze Profile"))
+        tab(at, "Skill & Resource Recommender")
+        counted("Skill & Resource Recommender", at, lambda: click(at, "Recommend Skills (detailed)"))
+        tab(at, "Learning Roadmap")
+        counted("Learning Roadmap", at, lambda: click(at, "Generate Roadmap"))
+        counted("Assessment", at, lambda: tab(at, "Assessment"))
+        generate = [b.label for b in at.button if b.label.startswith("Generate")]
+        if generate:
+            counted("Assessment", at, lambda: click(at, generate[0]))
+        counted("Progress Tracker & Dashboard", at, lambda: tab(at, "Progress Tracker & Dashboard"))
+
+
+def report(args, recorder, elapsed, fake_stats, io_before, io_after):
+    actions = sum(len(t) for t in recorder.timings.values())
+    print(f"\n{args.users} users, mode={args.mode}, concurrency={args.concurrency}, "
+          f"fake latency={args.latency}s, {args.tokens_per_second} tok/s")
+    print(f"elapsed {elapsed:.2f}s  throughput {args.users / elapsed:.2f} users/s, {actions / elapsed:.2f} actions/s\n")
+    print(f"{'tab':<30}{'n':>6}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'upstream/action':>17}{'failed':>8}")
+    for tab in TABS:
+        timings = recorder.timings.get(tab)
+        if not timings:
+            continue
+        p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+        per_action = recorder.upstream.get(tab, 0) / len(timings) if tab in TAB_SITES or args.mode == "apptest" else 0
+        print(f"{tab:<30}{len(timings):>6}{p50:>9.3f}{p95:>9.3f}{p99:>9.3f}{max(timings):>9.3f}"
+              f"{per_action:>17.2f}{recorder.failures.get(tab, 0):>8}")
+    upstream = fake_stats.snapshot()
+    print(f"\nupstream requests {upstream['requests']} ({upstream['errors']} errors), "
+          f"{upstream['distinct_prompts']} distinct prompts, {upstream['completion_tokens']} completion tokens")
+    if io_after:
+        print(f"storage I/O: read {io_after['read_bytes'] - io_before['read_bytes']} B, "
+              f"wrote {io_after['write_bytes'] - io_before['write_bytes']} B "
+              f"(syscalls incl. sockets: rchar {io_after['rchar'] - io_before['rchar']} B, "
+              f"wchar {io_after['wchar'] - io_before['wchar']} B)")
+    sizes = {name: os.path.getsize(name) for name in STORE_FILES if os.path.exists(name)}
+    print("store files: " + ", ".join(f"{name} {size} B" for name, size in sizes.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["logic", "apptest"], default="logic")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=50, help="simultaneous users (logic mode)")
+    parser.add_argument("--distinct-profiles", type=int, default=10,
+                        help="users share this many role/skills/goal combinations")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=300.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--workdir", help="scratch directory for the stores (default: a new temp dir)")
+    parser.add_argument("--keep-limits", action="store_true",
+                        help="keep the app's client-side rate limits instead of lifting them")
+    parser.add_argument("--timeout", type=float, default=120, help="AppTest run timeout (seconds)")
+    args = parser.parse_args()
+    if args.mode == "apptest":
+        args.concurrency = 1
+
+    server, fake_stats = start_server(0, FakeConfig(args.latency, args.tokens_per_second, args.error_rate))
+    workdir = args.workdir or tempfile.mkdtemp(prefix="coach-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    if args.mode == "apptest":
+        for name in os.listdir(REPO):
+            if name.endswith(".py") or name == "career coach.png":
+                target = os.path.join(workdir, name)
+                if not os.path.exists(target):
+                    os.symlink(os.path.join(REPO, name), target)
+    os.chdir(workdir)
+    sys.path.insert(0, REPO)
+    # The app modules read these at import time
+    os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ["GROQ_API_KEY"] = "fake"
+    os.environ.setdefault("USER_STORE_PATH", os.path.join(workdir, "users.db"))
+    os.environ.setdefault("LLM_CACHE_FILE", os.path.join(workdir, "llm_cache.db"))
+    os.environ.setdefault("QUESTION_BANK_PATH", os.path.join(workdir, "question_bank.db"))
+    if not args.keep_limits:
+        os.environ["LLM_REQUESTS_PER_MINUTE"] = "1000000"
+        os.environ["LLM_TOKENS_PER_MINUTE"] = "1000000000"
+    print(f"workdir {workdir}, fake Groq at {os.environ['GROQ_BASE_URL']}")
+
+    recorder = Recorder()
+    io_before = io_counters()
+    start = time.perf_counter()
+    if args.mode == "apptest":
+        run_apptest(args, recorder, fake_stats)
+    else:
+        run_logic(args, recorder)
+    elapsed = time.perf_counter() - start
+    report(args, recorder, elapsed, fake_stats, io_before, io_counters())
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+from llm import CACHE_TTLS, DEFAULT_TTL, complete, stream_complete
+from models import parse_skill_rows
+from prompts import (analyze_profile_prompt, call_options, job_profiles_prompt, recommend_skills_prompt,
+                     roadmap_prompt)
+from semantic_cache import SimilarProfileCache
+
+
+# Near-identical profiles share one analysis / recommendation
+similar_profiles = SimilarProfileCache()
+
+
+def remember_similar(site, role, skills, goal, text):
+    similar_profiles.set(site, role, skills, goal, text, CACHE_TTLS.get(site, DEFAULT_TTL))
+
+
+def analyze_profile(role, skills, goal, bypass_cache=False):
+    if not bypass_cache:
+        similar = similar_profiles.get("analyze_profile", role, skills, goal)
+        if similar is not None:
+            return similar
+    prompt = analyze_profile_prompt(role, skills, goal)
+    text = complete("analyze_profile", prompt, bypass_cache=bypass_cache, **call_options("analyze_profile")).strip()
+    remember_similar("analyze_profile", role, skills, goal, text)
+    return text
+
+
+def analyze_profile_stream(role, skills, goal, bypass_cache=False):
+    if not bypass_cache:
+        similar = similar_profiles.get("analyze_profile", role, skills, goal)
+        if similar is not None:
+            yield similar
+            return
+    prompt = analyze_profile_prompt(role, skills, goal)
+    parts = []
+    for delta in stream_complete("analyze_profile", prompt, bypass_cache=bypass_cache,
+                                 **call_options("analyze_profile")):
+        parts.append(delta)
+        yield delta
+    remember_similar("analyze_profile", role, skills, goal, "".join(parts).strip())
+
+
+def recommend_skills_plus(role, skills, goal, bypass_cache=False):
+    if not bypass_cache:
+        similar = similar_profiles.get("recommend_skills_plus", role, skills, goal)
+        if similar is not None:
+            return similar
+    prompt = recommend_skills_prompt(role, skills, goal)
+    text = complete("recommend_skills_plus", prompt, bypass_cache=bypass_cache,
+                    **call_options("recommend_skills_plus")).strip()
+    remember_similar("recommend_skills_plus", role, skills, goal, text)
+    return text
+
+
+def get_roadmap(role, skills, goal, roadmap_skills=None, bypass_cache=False):
+    prompt = roadmap_prompt(role, skills, goal, roadmap_skills)
+    return complete("get_roadmap", prompt, bypass_cache=bypass_cache, **call_options("get_roadmap")).strip()
+
+
+def get_roadmap_stream(role, skills, goal, roadmap_skills=None, bypass_cache=False):
+    prompt = roadmap_prompt(role, skills, goal, roadmap_skills)
+    return stream_complete("get_roadmap", prompt, bypass_cache=bypass_cache, **call_options("get_roadmap"))
+
+
+def suggest_job_profiles(goal, skills, roadmap_skills=None, bypass_cache=False):
+    prompt = job_profiles_prompt(goal, skills, roadmap_skills)
+    return complete("suggest_job_profiles", prompt, bypass_cache=bypass_cache,
+                    **call_options("suggest_job_profiles")).strip()
+
+
+def recommended_skill_names(skills_text):
+    return [row.skill for row in parse_skill_rows(skills_text)]
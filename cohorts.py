@@ -0,0 +1,251 @@
+"""Bulk profile export/import and cohort analytics.
+
+    python cohorts.py export profiles.parquet [--with-passwords]
+    python cohorts.py report profiles.parquet [--top 20]
+    python cohorts.py import profiles.parquet
+
+Profiles are read from the user store and written chunk by chunk, so memory
+stays bounded by USER_STORE_CHUNK_SIZE rather than the number of users. A
+``.parquet`` path writes Parquet; ``.arrow``, ``.feather`` or ``.ipc`` write
+the Arrow IPC file format. Reports aggregate one record batch at a time.
+"""
+import argparse
+import json
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from models import profile_records
+from progress import restore_progress
+from prompts import skill_list
+from user_store import USER_STORE_CHUNK_SIZE, get_store
+
+
+ARROW_SUFFIXES = (".arrow", ".feather", ".ipc")
+
+SCHEMA = pa.schema([
+    ("username", pa.string()),
+    ("role", pa.string()),
+    ("skills", pa.string()),
+    ("goal", pa.string()),
+    ("skills_list", pa.string()),
+    ("roadmap_text", pa.string()),
+    ("current_skills", pa.list_(pa.string())),
+    ("recommended_skills", pa.list_(pa.string())),
+    ("roadmap_weeks", pa.int32()),
+    ("weeks_passed", pa.int32()),
+    ("current_week_index", pa.int32()),
+    # The whole stored profile, so an import loses nothing
+    ("profile", pa.string()),
+])
+PASSWORD_FIELD = pa.field("password", pa.string())
+
+
+def profile_row(username, profile):
+    skill_rows, roadmap_weeks, _ = profile_records(profile)
+    progress = restore_progress(profile)
+    return {
+        "username": username,
+        "role": profile.get("role", ""),
+        "skills": profile.get("skills", ""),
+        "goal": profile.get("goal", ""),
+        "skills_list": profile.get("skills_list", ""),
+        "roadmap_text": profile.get("roadmap_text", ""),
+        "current_skills": skill_list(profile.get("skills", "")),
+        "recommended_skills": [row.skill for row in skill_rows],
+        "roadmap_weeks": len(roadmap_weeks),
+        "weeks_passed": len(progress["mastered"]),
+        "current_week_index": progress["current_week_index"],
+        "profile": json.dumps(profile),
+    }
+
+
+def _is_arrow(path):
+    return str(path).lower().endswith(ARROW_SUFFIXES)
+
+
+def export_profiles(path, chunk_size=USER_STORE_CHUNK_SIZE, with_passwords=False, store=None):
+    """Write every stored profile to ``path``; returns the number of users written.
+
+    Password hashes are left out unless ``with_passwords`` is set, which an
+    import needs to create users that do not exist yet.
+    """
+    store = store or get_store()
+    schema = SCHEMA.append(PASSWORD_FIELD) if with_passwords else SCHEMA
+    writer = pa.ipc.new_file(path, schema) if _is_arrow(path) else pq.ParquetWriter(path, schema)
+    written = 0
+    try:
+        for chunk in store.iter_users(chunk_size):
+            rows = []
+            for username, password_hash, profile in chunk:
+                row = profile_row(username, profile)
+                if with_passwords:
+                    row["password"] = password_hash
+                rows.append(row)
+            writer.write_table(pa.Table.from_pandas(pd.DataFrame(rows, columns=schema.names), schema=schema,
+                                                    preserve_index=False))
+            written += len(rows)
+    finally:
+        writer.close()
+    return written
+
+
+def iter_batches(path, columns=None, batch_size=USER_STORE_CHUNK_SIZE):
+    # DataFrames of at most ``batch_size`` rows from a Parquet or Arrow export
+    if _is_arrow(path):
+        with pa.memory_map(str(path)) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                table = pa.Table.from_batches([reader.get_batch(i)])
+                for batch in table.to_batches(max_chunksize=batch_size):
+                    yield (batch.select(columns) if columns else batch).to_pandas()
+        return
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=columns):
+        yield batch.to_pandas()
+
+
+def import_profiles(path, chunk_size=USER_STORE_CHUNK_SIZE, store=None):
+    """Load an export back into the user store; returns (created, updated, skipped).
+
+    Existing users have their profile replaced. Users that do not exist yet
+    are only created when the export carries password hashes.
+    """
+    store = store or get_store()
+    if _is_arrow(path):
+        with pa.memory_map(str(path)) as source:
+            names = pa.ipc.open_file(source).schema.names
+    else:
+        names = pq.ParquetFile(path).schema_arrow.names
+    columns = ["username", "profile"] + (["password"] if "password" in names else [])
+    totals = [0, 0, 0]
+    for batch in iter_batches(path, columns, chunk_size):
+        passwords = batch["password"] if "password" in batch else [None] * len(batch)
+        counts = store.import_users(list(zip(batch["username"], passwords, batch["profile"].map(json.loads))))
+        totals = [total + count for total, count in zip(totals, counts)]
+    return tuple(totals)
+
+
+def _normalize(series):
+    # Case and whitespace insensitive, so "Data  Scientist" and "data scientist" group together
+    return series.fillna("").astype(str).str.lower().str.split().str.join(" ")
+
+
+def _skill_counts(batch, column):
+    # Users per skill; a skill listed twice by one user counts once
+    skills = batch[column].explode().dropna()
+    frame = pd.DataFrame({"user": skills.index, "skill": _normalize(skills).values})
+    return frame[frame["skill"] != ""].drop_duplicates()["skill"].value_counts()
+
+
+def _goal_skill_counts(batch):
+    paths = batch[["goal", "recommended_skills"]].explode("recommended_skills").dropna()
+    frame = pd.DataFrame({
+        "user": paths.index,
+        "goal": _normalize(paths["goal"]).values,
+        "skill": _normalize(paths["recommended_skills"]).values,
+    })
+    frame = frame[(frame["goal"] != "") & (frame["skill"] != "")].drop_duplicates()
+    return frame.groupby(["goal", "skill"]).size()
+
+
+def _goal_progress(batch):
+    frame = batch.assign(goal=_normalize(batch["goal"]))
+    frame = frame[frame["roadmap_weeks"] > 0]
+    return frame.groupby("goal").agg(
+        users=("username", "size"),
+        weeks_passed=("weeks_passed", "sum"),
+        roadmap_weeks=("roadmap_weeks", "sum"),
+    )
+
+
+def _add(total, part):
+    return part if total is None else total.add(part, fill_value=0)
+
+
+def cohort_report(path, top=20, batch_size=USER_STORE_CHUNK_SIZE):
+    """Cohort tables for an export, aggregated one batch at a time.
+
+    Returns a dict of DataFrames: ``recommended_skills`` and ``current_skills``
+    (users per skill), ``goal_skill_paths`` (users per goal and recommended
+    skill) and ``progress_by_goal`` (mean weeks passed among users with a
+    roadmap), plus ``totals`` with overall counts.
+    """
+    columns = ["username", "goal", "current_skills", "recommended_skills", "roadmap_weeks", "weeks_passed"]
+    recommended = current = paths = progress = None
+    users = with_roadmap = weeks_passed = 0
+    for batch in iter_batches(path, columns, batch_size):
+        users += len(batch)
+        has_roadmap = batch["roadmap_weeks"] > 0
+        with_roadmap += int(has_roadmap.sum())
+        weeks_passed += int(batch.loc[has_roadmap, "weeks_passed"].sum())
+        recommended = _add(recommended, _skill_counts(batch, "recommended_skills"))
+        current = _add(current, _skill_counts(batch, "current_skills"))
+        paths = _add(paths, _goal_skill_counts(batch))
+        progress = _add(progress, _goal_progress(batch))
+
+    def ranked(counts, name):
+        if counts is None or counts.empty:
+            return pd.DataFrame(columns=[name, "users"])
+        counts = counts.astype(int).sort_values(ascending=False, kind="stable").head(top)
+        return counts.rename("users").rename_axis(name).reset_index()
+
+    if paths is None or paths.empty:
+        path_table = pd.DataFrame(columns=["goal", "skill", "users"])
+    else:
+        path_table = (paths.astype(int).rename("users").reset_index()
+                      .sort_values(["users", "goal", "skill"], ascending=[False, True, True]).head(top))
+    if progress is None or progress.empty:
+        progress_table = pd.DataFrame(columns=["goal", "users", "mean_weeks_passed", "mean_roadmap_weeks"])
+    else:
+        progress_table = pd.DataFrame({
+            "users": progress["users"].astype(int),
+            "mean_weeks_passed": progress["weeks_passed"] / progress["users"],
+            "mean_roadmap_weeks": progress["roadmap_weeks"] / progress["users"],
+        }).sort_values("users", ascending=False, kind="stable").head(top).reset_index()
+    return {
+        "recommended_skills": ranked(recommended, "skill"),
+        "current_skills": ranked(current, "skill"),
+        "goal_skill_paths": path_table.reset_index(drop=True),
+        "progress_by_goal": progress_table,
+        "totals": pd.DataFrame([{
+            "users": users,
+            "with_roadmap": with_roadmap,
+            "mean_weeks_passed": weeks_passed / with_roadmap if with_roadmap else None,
+        }]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="write all profiles to a Parquet/Arrow file")
+    export.add_argument("path")
+    export.add_argument("--with-passwords", action="store_true",
+                        help="include password hashes so an import can create missing users")
+    report = commands.add_parser("report", help="cohort tables for an export")
+    report.add_argument("path")
+    report.add_argument("--top", type=int, default=20)
+    load = commands.add_parser("import", help="create or replace profiles from an export")
+    load.add_argument("path")
+    for command in (export, report, load):
+        command.add_argument("--chunk-size", type=int, default=USER_STORE_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        written = export_profiles(args.path, args.chunk_size, args.with_passwords)
+        print(f"exported {written} users to {args.path}")
+    elif args.command == "import":
+        created, updated, skipped = import_profiles(args.path, args.chunk_size)
+        print(f"created {created}, updated {updated}, skipped {skipped}")
+        if skipped:
+            print("skipped users do not exist here and the export has no password hashes (use --with-passwords)")
+    else:
+        with pd.option_context("display.width", 160, "display.max_colwidth", 60):
+            for name, table in cohort_report(args.path, args.top, args.chunk_size).items():
+                print(f"\n== {name.replace('_', ' ')} ==")
+                print(table.to_string(index=False) if not table.empty else "(none)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Startup and import-time diagnostics.
+
+    python diagnostics.py            # -X importtime profile of the app's imports
+
+The same report is available on the Admin Metrics page.
+"""
+import os
+import re
+import subprocess
+import sys
+import time
+
+
+_imported_at = time.time()
+
+# Dependencies the app loads lazily, on the tab that needs them
+HEAVY_MODULES = ("pandas", "numpy", "plotly", "fpdf", "groq", "pyarrow")
+# What app.py imports when the login page renders
+STARTUP_MODULES = ("streamlit", "dotenv", "coach", "grading", "progress", "question_bank", "jobs", "metrics",
+                   "user_store")
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def process_started():
+    # Wall-clock start of this process (Linux /proc); elsewhere, when this module was imported
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/stat") as f:
+            boot_time = next(int(line.split()[1]) for line in f if line.startswith("btime"))
+        return boot_time + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, StopIteration):
+        return _imported_at
+
+
+PROCESS_STARTED = process_started()
+_marks = {}
+
+
+def mark(name):
+    # Seconds from process start to the first time ``name`` happened
+    _marks.setdefault(name, time.time() - PROCESS_STARTED)
+
+
+def marks():
+    return dict(_marks)
+
+
+def loaded_heavy_modules():
+    return {name: name in sys.modules for name in HEAVY_MODULES}
+
+
+def import_profile(modules=STARTUP_MODULES + HEAVY_MODULES, limit=30):
+    """Run ``python -X importtime`` in a fresh interpreter for ``modules``.
+
+    Returns (rows, total_seconds); rows are (module, self_ms, cumulative_ms,
+    depth) sorted by cumulative time, top-level imports have depth 0.
+    """
+    code = "\n".join(f"import {name}" for name in modules)
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, timeout=120,
+    )
+    total = time.perf_counter() - started
+    rows = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us) / 1000, int(cumulative_us) / 1000, (len(indent) - 1) // 2))
+    rows.sort(key=lambda row: row[2], reverse=True)
+    return rows[:limit], total
+
+
+def main():
+    rows, total = import_profile()
+    print(f"{'module':<40}{'self ms':>10}{'cumulative ms':>15}")
+    for name, self_ms, cumulative_ms, depth in rows:
+        print(f"{'  ' * depth + name:<40}{self_ms:>10.1f}{cumulative_ms:>15.1f}")
+    print(f"\ninterpreter start + imports: {total:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
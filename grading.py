@@ -0,0 +1,49 @@
+import os
+import time
+from dataclasses import dataclass
+
+from progress import PASS_MARK
+
+
+@dataclass(frozen=True)
+class GradingPolicy:
+    pass_mark: float = PASS_MARK
+    # Points per question; the defaults keep the original 100/40 weighting
+    correct_points: float = 100.0
+    incorrect_points: float = 40.0
+    # "latest": the week's score is the most recent attempt; "best": best attempt
+    aggregate: str = "latest"
+
+
+POLICY = GradingPolicy(
+    pass_mark=float(os.getenv("GRADING_PASS_MARK", PASS_MARK)),
+    aggregate=os.getenv("GRADING_AGGREGATE", "latest"),
+)
+
+
+def grade(questions, answers, policy=POLICY):
+    """Score one attempt. ``answers`` maps question index to the chosen option.
+
+    Returns (score, correct) where ``correct`` is a boolean array per question.
+    """
+    import numpy as np
+    key = np.array([q["answer"] for q in questions], dtype=object)
+    given = np.array([answers.get(ix, "") for ix in range(len(questions))], dtype=object)
+    correct = (key == given).astype(bool)
+    if not len(correct):
+        return 0.0, correct
+    points = np.where(correct, policy.correct_points, policy.incorrect_points)
+    return float(points.mean()), correct
+
+
+def attempt_record(score, correct):
+    # Compact history entry: unix time, score, and a 0/1 string per question
+    return {"t": int(time.time()), "s": round(score, 1), "c": "".join("1" if c else "0" for c in correct)}
+
+
+def week_score(attempts, policy=POLICY):
+    if not attempts:
+        return 0.0
+    import numpy as np
+    scores = np.fromiter((a["s"] for a in attempts), dtype=float, count=len(attempts))
+    return float(scores.max() if policy.aggregate == "best" else scores[-1])
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "jobs.db")
+# Finished jobs (results included) stay in memory this long for sessions to
+# pick up; their output is in the profile or question bank by then anyway
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", "3600"))
+# Rows older than this are deleted from the jobs table
+JOB_HISTORY_DAYS = int(os.getenv("JOB_HISTORY_DAYS", "7"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def job_key(params):
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class Job:
+    """One background generation for one user and action.
+
+    ``partial`` holds output so far for the UI to show while it polls;
+    ``superseded`` is set when a newer submission of the same action replaces
+    this one, and the job should then not write its result to the profile.
+    """
+
+    def __init__(self, username, action, key):
+        self.id = uuid.uuid4().hex
+        self.username = username
+        self.action = action
+        self.key = key
+        self.status = QUEUED
+        self.partial = ""
+        self.result = None
+        self.error = None
+        self.superseded = False
+        self.finished_at = None
+        self._finished = threading.Event()
+
+    @property
+    def finished(self):
+        return self._finished.is_set()
+
+    def update(self, partial):
+        self.partial = partial
+
+    def wait(self, timeout=None):
+        return self._finished.wait(timeout)
+
+
+class JobQueue:
+    """Per-process worker pool with a job table keyed by user and action.
+
+    Submitting the same action with the same parameters while it is queued or
+    running returns the existing job. Jobs outlive the script run that
+    submitted them, so reruns and tab switches no longer discard LLM work.
+    """
+
+    def __init__(self, db_path=JOBS_DB_PATH, workers=JOB_WORKERS):
+        self.db_path = db_path
+        # Jobs make their LLM calls on these threads (MCQ jobs fan out on the
+        # orchestrator pool); either way llm.in_flight caps the calls in flight.
+        # A separate pool keeps a job waiting on its MCQ batches from holding
+        # an orchestrator thread the batches need
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jobs")
+        self._lock = threading.Lock()
+        self._latest = {}
+        self._local = threading.local()
+        self._pruned_at = 0.0
+        with self._conn() as conn:
+            # Whatever was queued or running died with the previous process
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = 'interrupted by restart', finished_at = ? "
+                "WHERE status IN (?, ?)",
+                (FAILED, time.time(), QUEUED, RUNNING),
+            )
+        self._prune()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, username TEXT, action TEXT, job_key TEXT, status TEXT, error TEXT, "
+                "created_at REAL, started_at REAL, finished_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_user_action ON jobs (username, action, created_at)")
+            self._local.conn = conn
+        return conn
+
+    def _prune(self):
+        # Drop finished jobs past JOB_RESULT_TTL from memory and old rows from
+        # the table; runs at most once per minute, from submit()
+        now = time.time()
+        if now - self._pruned_at < 60:
+            return
+        self._pruned_at = now
+        with self._lock:
+            for owner, job in list(self._latest.items()):
+                if job.finished and job.finished_at < now - JOB_RESULT_TTL:
+                    del self._latest[owner]
+        with self._conn() as conn:
+            conn.execute("DELETE FROM jobs WHERE created_at < ?", (now - JOB_HISTORY_DAYS * 24 * 60 * 60,))
+
+    def submit(self, username, action, params, fn, *args):
+        """Run ``fn(job, *args)`` in the background; its return value becomes ``job.result``."""
+        self._prune()
+        key = job_key(params)
+        with self._lock:
+            current = self._latest.get((username, action))
+            if current is not None and not current.finished and current.key == key:
+                return current
+            if current is not None:
+                current.superseded = True
+            job = self._latest[(username, action)] = Job(username, action, key)
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, username, action, job_key, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job.id, username, action, key, QUEUED, time.time()),
+            )
+        self._executor.submit(self._run, job, fn, args)
+        return job
+
+    def _run(self, job, fn, args):
+        try:
+            job.status = RUNNING
+            with self._conn() as conn:
+                conn.execute("UPDATE jobs SET status = ?, started_at = ? WHERE id = ?", (RUNNING, time.time(), job.id))
+            job.result = fn(job, *args)
+            job.status = DONE
+        except Exception as e:
+            job.error = e
+            job.status = FAILED
+        finally:
+            # Wake pollers even if the table update below fails
+            job.finished_at = time.time()
+            job._finished.set()
+        with self._conn() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                (job.status, str(job.error) if job.error else None, job.finished_at, job.id),
+            )
+
+    def latest(self, username, action):
+        with self._lock:
+            return self._latest.get((username, action))
+
+    def user_jobs(self, username):
+        with self._lock:
+            return {action: job for (user, action), job in self._latest.items() if user == username}
+
+    def counts(self):
+        return self._conn().execute(
+            "SELECT action, status, COUNT(*), AVG(finished_at - started_at) FROM jobs "
+            "GROUP BY action, status ORDER BY action, status"
+        ).fetchall()
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    # Built on first use, not at import: starting a queue marks the jobs table's
+    # queued and running rows as failed, which must not happen when another
+    # process (e.g. the diagnostics import profile) merely imports this module
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue()
+    return _job_queue
@@ -0,0 +1,223 @@
+import os
+import threading
+from metrics import registry as metrics
+from orchestrator import LLM_MAX_CONCURRENCY
+from prompts import count_tokens
+from rate_limit import Abandoned, RateLimiter, SingleFlight, retry_call
+from response_cache import ResponseCache, make_key
+
+
+DEFAULT_MODEL = "llama-3.3-70b-versatile"
+# Per-request timeout (seconds) applied to every Groq call
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "60"))
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+# How long a cached completion stays valid, per call site
+CACHE_TTLS = {
+    "analyze_profile": 7 * DAY,
+    "recommend_skills_plus": 3 * DAY,
+    "get_roadmap": 7 * DAY,
+    "suggest_job_profiles": 1 * DAY,
+    "generate_mcqs": 30 * DAY,
+}
+DEFAULT_TTL = 1 * DAY
+
+# Client-side limits shared by every session of this process; keep them a
+# little under the account's provider limits
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "30"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "12000"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+EXPECTED_COMPLETION_TOKENS = 1024
+# An answer that stops at max_tokens is asked to continue this many times
+# before it is given up on (and never cached)
+LLM_MAX_CONTINUATIONS = int(os.getenv("LLM_MAX_CONTINUATIONS", "1"))
+CONTINUE_PROMPT = "Continue exactly where you stopped. Do not repeat anything you already wrote."
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+_client = None
+_client_lock = threading.Lock()
+cache = ResponseCache()
+limiter = RateLimiter(LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE)
+flights = SingleFlight()
+# Held for the whole upstream call, streamed body included, whichever thread
+# makes it: session script runs, background jobs or the orchestrator pool
+in_flight = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+
+
+class LLMError(Exception):
+    """The LLM service could not produce an answer; the message is user-facing."""
+
+
+class Truncated(LLMError):
+    """The answer still hit max_tokens after LLM_MAX_CONTINUATIONS continuations."""
+
+    def __init__(self):
+        super().__init__("The answer was too long and got cut off. Please try again.")
+
+
+def _groq():
+    # The SDK (httpx, pydantic) takes a few hundred ms to import; only the
+    # first LLM call of the process pays for it, not the login page
+    import groq
+    return groq
+
+
+def get_client():
+    # One client (and connection pool) per process, shared by all sessions
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                # Retries are handled by retry_call below. Set GROQ_BASE_URL to point
+                # the client at a local fake server (see bench/fake_groq.py)
+                _client = _groq().Groq(api_key=os.getenv("GROQ_API_KEY"), timeout=LLM_REQUEST_TIMEOUT,
+                                       max_retries=0)
+    return _client
+
+
+def estimate_tokens(prompt, max_tokens=None):
+    return count_tokens(prompt) + (max_tokens or EXPECTED_COMPLETION_TOKENS)
+
+
+def is_retryable(error):
+    if isinstance(error, _groq().APIConnectionError):
+        return True
+    return getattr(error, "status_code", None) in RETRYABLE_STATUS
+
+
+def _error_message(error):
+    if getattr(error, "status_code", None) == 429:
+        return "The AI service is rate limited right now. Please try again in a minute."
+    return "The AI service is unavailable right now. Please try again."
+
+
+def _request(model, prompt, so_far=None, **kwargs):
+    # ``so_far``: a truncated answer to continue rather than start over
+    kwargs = {name: value for name, value in kwargs.items() if value is not None}
+    messages = [{"role": "user", "content": prompt}]
+    if so_far:
+        messages += [{"role": "assistant", "content": so_far}, {"role": "user", "content": CONTINUE_PROMPT}]
+    estimated = estimate_tokens(prompt + (so_far or ""), kwargs.get("max_tokens"))
+    def attempt():
+        return get_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            **kwargs
+        )
+    # One reservation per logical request: retries back off on their own and
+    # must not charge the token budget again. A request that never produced
+    # an answer gives its reservation back.
+    limiter.acquire(estimated)
+    try:
+        return retry_call(attempt, is_retryable, retries=LLM_MAX_RETRIES), estimated
+    except _groq().APIError as e:
+        limiter.settle(estimated, 0)
+        raise LLMError(_error_message(e)) from e
+    except Exception:
+        limiter.settle(estimated, 0)
+        raise
+
+
+def complete(site, prompt, model=DEFAULT_MODEL, bypass_cache=False, max_tokens=None):
+    key = make_key(model, prompt, max_tokens=max_tokens)
+    timing = metrics.start(site)
+    if not bypass_cache:
+        cached = cache.get(key, site)
+        if cached is not None:
+            timing.finish(cache_hit=True)
+            return cached
+    def fetch():
+        timing.upstream = True
+        text = ""
+        for _ in range(LLM_MAX_CONTINUATIONS + 1):
+            with in_flight:
+                response, estimated = _request(model, prompt, text, max_tokens=max_tokens)
+            timing.usage = response.usage
+            if response.usage:
+                limiter.settle(estimated, response.usage.total_tokens)
+            text += response.choices[0].message.content or ""
+            if response.choices[0].finish_reason != "length":
+                cache.set(key, text, CACHE_TTLS.get(site, DEFAULT_TTL), site)
+                return text
+        # A cut-off answer must not be cached (or parsed) as if it were complete
+        raise Truncated()
+    # Identical prompts already in flight from other sessions share one request
+    try:
+        text = flights.do(key, fetch)
+    except Exception as e:
+        timing.finish(error=e)
+        raise
+    timing.finish()
+    return text
+
+
+def stream_complete(site, prompt, model=DEFAULT_MODEL, bypass_cache=False, max_tokens=None):
+    # Yields text deltas as they arrive; only a fully received answer is cached
+    key = make_key(model, prompt, max_tokens=max_tokens)
+    timing = metrics.start(site)
+    if not bypass_cache:
+        cached = cache.get(key, site)
+        if cached is not None:
+            timing.finish(cache_hit=True)
+            yield cached
+            return
+    call, leader = flights.begin(key)
+    if not leader:
+        try:
+            text = call.wait()
+        except Abandoned:
+            # complete() records its own timing
+            yield complete(site, prompt, model, bypass_cache, max_tokens)
+            return
+        except Exception as e:
+            timing.finish(error=e)
+            raise
+        timing.finish()
+        yield text
+        return
+    timing.upstream = True
+    parts = []
+    in_flight.acquire()
+    try:
+        for _ in range(LLM_MAX_CONTINUATIONS + 1):
+            # A truncated answer continues in the same stream of deltas
+            stream, estimated = _request(model, prompt, "".join(parts), stream=True, max_tokens=max_tokens)
+            truncated = False
+            for chunk in stream:
+                usage = getattr(getattr(chunk, "x_groq", None), "usage", None)
+                if usage:
+                    timing.usage = usage
+                    limiter.settle(estimated, usage.total_tokens)
+                if not chunk.choices:
+                    continue
+                truncated = chunk.choices[0].finish_reason == "length" or truncated
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    timing.first_token()
+                    parts.append(delta)
+                    yield delta
+            if not truncated:
+                break
+        else:
+            raise Truncated()
+    except _groq().APIError as e:
+        error = LLMError(_error_message(e))
+        flights.finish(key, call, error=error)
+        timing.finish(error=error)
+        raise error from e
+    except LLMError as e:
+        flights.finish(key, call, error=e)
+        timing.finish(error=e)
+        raise
+    except BaseException:
+        # The session reran or navigated away mid-stream; not a latency sample
+        flights.finish(key, call, error=Abandoned())
+        raise
+    finally:
+        in_flight.release()
+    text = "".join(parts)
+    cache.set(key, text, CACHE_TTLS.get(site, DEFAULT_TTL), site)
+    flights.finish(key, call, result=text)
+    timing.finish()
@@ -0,0 +1,149 @@
+import json
+import queue
+import random
+
+from llm import stream_complete
+from orchestrator import BATCH_TIMEOUT, Batch
+from prompts import call_options, mcq_max_tokens, mcq_prompt
+
+
+MCQ_TOTAL = 20
+MCQ_BATCH_SIZE = 5
+MCQ_MAX_ATTEMPTS = 3
+
+
+def validate_question(obj):
+    # Returns a cleaned question dict, or None if it does not match the schema
+    if not isinstance(obj, dict):
+        return None
+    question, options, answer = obj.get("question"), obj.get("options"), obj.get("answer")
+    if not isinstance(question, str) or not question.strip():
+        return None
+    if not isinstance(options, list) or len(options) != 4:
+        return None
+    if not all(isinstance(o, str) and o.strip() for o in options):
+        return None
+    options = [o.strip() for o in options]
+    if len(set(options)) != 4 or not isinstance(answer, str) or answer.strip() not in options:
+        return None
+    return {"question": question.strip(), "options": options, "answer": answer.strip()}
+
+
+def shuffled(questions):
+    # Same questions, new question and option order, for a retry after a failed attempt
+    questions = [dict(q, options=random.sample(q["options"], len(q["options"]))) for q in questions]
+    random.shuffle(questions)
+    return questions
+
+
+class JsonObjectStream:
+    """Pulls complete top-level ``{...}`` objects out of streamed JSON text.
+
+    Text outside objects (prose, code fences, the enclosing ``[``) is skipped,
+    so one malformed object costs that question only, not the whole batch.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.depth = 0
+        self.start = 0
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, text):
+        self.buffer += text
+        found = []
+        while self.pos < len(self.buffer):
+            ch = self.buffer[self.pos]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"' and self.depth:
+                self.in_string = True
+            elif ch == "{":
+                if not self.depth:
+                    self.start = self.pos
+                self.depth += 1
+            elif ch == "}" and self.depth:
+                self.depth -= 1
+                if not self.depth:
+                    try:
+                        found.append(json.loads(self.buffer[self.start:self.pos + 1]))
+                    except ValueError:
+                        pass
+            self.pos += 1
+        if not self.depth:
+            self.buffer, self.pos = "", 0
+        return found
+
+
+def _run_batch(events, index, task, count, set_number, total_sets, bypass_cache):
+    parser = JsonObjectStream()
+    prompt = mcq_prompt(task, count, set_number, total_sets)
+    valid = 0
+    options = call_options("generate_mcqs", max_tokens=mcq_max_tokens(count))
+    for chunk in stream_complete("generate_mcqs", prompt, bypass_cache=bypass_cache, **options):
+        for obj in parser.feed(chunk):
+            question = validate_question(obj)
+            if question and valid < count:
+                valid += 1
+                events.put(("question", index, question))
+    return valid
+
+
+def generate_mcqs(task, total=MCQ_TOTAL, batch_size=MCQ_BATCH_SIZE, on_question=None, bypass_cache=False):
+    """Generate ``total`` questions as parallel batches, streaming each one.
+
+    ``on_question(question, questions_so_far)`` is called on the calling
+    thread as soon as a question validates. Batches that come back short are
+    retried for the missing questions only. Returns the collected questions
+    and a list of error messages for batches that never completed.
+    """
+    total_sets = -(-total // batch_size)
+    events = queue.Queue()
+    batch = Batch()
+    attempts = {}
+    wanted = {}
+    questions, seen, errors = [], set(), []
+
+    def launch(index, count, fresh):
+        attempts[index] = attempts.get(index, 0) + 1
+        wanted[index] = count
+        future = batch.submit((index, attempts[index]), _run_batch, events, index, task, count,
+                              index + 1, total_sets, fresh)
+        future.add_done_callback(lambda f: events.put(("done", index, f)))
+
+    try:
+        for index in range(total_sets):
+            launch(index, min(batch_size, total - index * batch_size), bypass_cache)
+        running = total_sets
+        while running:
+            kind, index, payload = events.get(timeout=BATCH_TIMEOUT)
+            if kind == "question":
+                key = payload["question"].lower()
+                if key in seen:
+                    continue
+                seen.add(key)
+                questions.append(payload)
+                wanted[index] -= 1
+                if on_question:
+                    on_question(payload, questions)
+                continue
+            running -= 1
+            error = payload.exception() if not payload.cancelled() else None
+            if wanted[index] > 0 and attempts[index] < MCQ_MAX_ATTEMPTS:
+                # Keep what this batch produced; ask again only for what is missing
+                launch(index, wanted[index], True)
+                running += 1
+            elif wanted[index] > 0:
+                errors.append(str(error) if error else f"Question set {index + 1} came back incomplete.")
+    except queue.Empty:
+        errors.append("Timed out waiting for questions.")
+    finally:
+        batch.cancel()
+    return questions[:total], errors
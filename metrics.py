@@ -0,0 +1,169 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Latency samples kept per call site for percentile summaries
+SAMPLE_WINDOW = int(os.getenv("METRICS_SAMPLE_WINDOW", "2048"))
+TRACE_FILE = os.getenv("LLM_TRACE_FILE")
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _quantile(sorted_values, q):
+    if not sorted_values:
+        return None
+    ix = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[ix]
+
+
+class SiteStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.durations = deque(maxlen=SAMPLE_WINDOW)
+        self.ttfts = deque(maxlen=SAMPLE_WINDOW)
+
+
+class LLMCall:
+    """Timing/usage for one call at one prompt site; finish() records it."""
+
+    def __init__(self, registry, site):
+        self.registry = registry
+        self.site = site
+        self.started = time.perf_counter()
+        self.ttft = None
+        self.upstream = False
+        self.usage = None
+
+    def first_token(self):
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self.started
+
+    def finish(self, cache_hit=False, error=None):
+        self.registry.record(self, time.perf_counter() - self.started, cache_hit, error)
+
+
+class MetricsRegistry:
+    def __init__(self, trace_file=TRACE_FILE):
+        self._lock = threading.Lock()
+        self.sites = {}
+        self.trace_file = trace_file
+
+    def start(self, site):
+        return LLMCall(self, site)
+
+    def record(self, call, duration, cache_hit, error):
+        prompt_tokens = getattr(call.usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(call.usage, "completion_tokens", 0) or 0
+        with self._lock:
+            stats = self.sites.setdefault(call.site, SiteStats())
+            stats.calls += 1
+            if error is not None:
+                stats.errors += 1
+            elif cache_hit:
+                stats.cache_hits += 1
+            else:
+                if not call.upstream:
+                    # Served by an identical request already in flight
+                    stats.coalesced += 1
+                stats.durations.append(duration)
+                stats.ttfts.append(call.ttft if call.ttft is not None else duration)
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+            if self.trace_file:
+                with open(self.trace_file, "a") as f:
+                    f.write(json.dumps({
+                        "ts": time.time(),
+                        "site": call.site,
+                        "duration": round(duration, 4),
+                        "ttft": round(call.ttft, 4) if call.ttft is not None else None,
+                        "cache_hit": cache_hit,
+                        "upstream": call.upstream,
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "error": type(error).__name__ if error is not None else None,
+                    }) + "\n")
+
+    def summary(self):
+        rows = []
+        with self._lock:
+            for site, stats in sorted(self.sites.items()):
+                durations = sorted(stats.durations)
+                ttfts = sorted(stats.ttfts)
+                row = {
+                    "site": site,
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "cache_hits": stats.cache_hits,
+                    "coalesced": stats.coalesced,
+                    "prompt_tokens": stats.prompt_tokens,
+                    "completion_tokens": stats.completion_tokens,
+                }
+                for q in QUANTILES:
+                    label = f"p{int(q * 100)}"
+                    row[f"latency_{label}"] = _quantile(durations, q)
+                    row[f"ttft_{label}"] = _quantile(ttfts, q)
+                rows.append(row)
+        return rows
+
+    def prometheus(self):
+        lines = []
+        counters = [
+            ("llm_calls_total", "calls", "LLM calls per prompt site, including cache hits"),
+            ("llm_errors_total", "errors", "LLM calls that raised"),
+            ("llm_cache_hits_total", "cache_hits", "Calls answered from the response cache"),
+            ("llm_coalesced_total", "coalesced", "Calls that joined an identical in-flight request"),
+            ("llm_prompt_tokens_total", "prompt_tokens", "Prompt tokens reported by the API"),
+            ("llm_completion_tokens_total", "completion_tokens", "Completion tokens reported by the API"),
+        ]
+        summary = self.summary()
+        for name, field, help_text in counters:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for row in summary:
+                lines.append(f'{name}{{site="{row["site"]}"}} {row[field]}')
+        for name, prefix, help_text in [
+            ("llm_latency_seconds", "latency", "Wall time of upstream LLM calls"),
+            ("llm_ttft_seconds", "ttft", "Time to first token of upstream LLM calls"),
+        ]:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} summary")
+            for row in summary:
+                for q in QUANTILES:
+                    value = row[f"{prefix}_p{int(q * 100)}"]
+                    if value is not None:
+                        lines.append(f'{name}{{site="{row["site"]}",quantile="{q}"}} {value:.6f}')
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def start_http_server(port, host="0.0.0.0"):
+    # Serves registry.prometheus() at /metrics for a Prometheus scraper
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
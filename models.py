@@ -0,0 +1,134 @@
+import hashlib
+import re
+from dataclasses import dataclass
+
+
+# Bump when the parsers change so stored records are rebuilt from the raw text
+PARSE_VERSION = 3
+
+# "Week 3:", "**Week 3 -** ...", "Weeks 1-4:", "1. Week 3: ...", "### Week 3"
+WEEK_HEADER = re.compile(
+    r"^[\s>#*\-\d.)]*?\**\s*(weeks?\s*\d+(?:\s*(?:-|–|to)\s*\d+)?)\s*\**\s*[:\-–—.]?\s*\**\s*(.*)$",
+    re.IGNORECASE,
+)
+MARKDOWN_NOISE = re.compile(r"^[\s\-*•>#\d.)]+|\*\*|__")
+# A week's detail line: a bullet, a numbered item or anything indented
+DETAIL_LINE = re.compile(r"^(?:\s+\S|\s*(?:[-*•+]|\d+[.)])\s)")
+
+
+@dataclass
+class SkillRow:
+    __slots__ = ("skill", "description", "resource_name", "resource_link")
+    skill: str
+    description: str
+    resource_name: str
+    resource_link: str
+
+    def to_row(self):
+        return [self.skill, self.description, self.resource_name, self.resource_link]
+
+
+@dataclass
+class RoadmapWeek:
+    __slots__ = ("week", "task")
+    week: str
+    task: str
+
+    def to_row(self):
+        return [self.week, self.task]
+
+
+def roadmap_hash(roadmap_text):
+    return hashlib.sha256(roadmap_text.encode()).hexdigest()
+
+
+def _clean(text):
+    return MARKDOWN_NOISE.sub("", text).strip()
+
+
+def parse_skill_rows(skills_text):
+    rows = []
+    for line in skills_text.split('\n'):
+        line = line.strip()
+        if line.startswith("|") and line.endswith("|"):
+            # Markdown table row
+            line = line[1:-1]
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) != 4:
+            continue
+        skill = _clean(parts[0])
+        if not skill or set(parts[1]) <= set("-: ") or skill.lower() == "skill name":
+            # Table separator or header
+            continue
+        rows.append(SkillRow(skill, parts[1], parts[2], parts[3]))
+    return rows
+
+
+def parse_roadmap_weeks(roadmap_text):
+    """Split a plain-text roadmap into weeks.
+
+    A week is a "Week N" header line; when the header carries no task, the
+    lines below it become the task, up to the next header or blank line. Only
+    a bullet may continue them after a blank line, so closing prose such as
+    "By following this roadmap..." is not part of the last week.
+    """
+    weeks = []
+    current = None
+    details = []
+    collecting = False
+    after_blank = False
+
+    def close():
+        if current is not None:
+            task = current[1] or "; ".join(details)
+            if task:
+                weeks.append(RoadmapWeek(current[0], task))
+
+    for line in roadmap_text.split('\n'):
+        match = WEEK_HEADER.match(line)
+        if match:
+            close()
+            label = re.sub(r"\s+", " ", match.group(1)).strip()
+            current = (label[0].upper() + label[1:], _clean(match.group(2)))
+            details = []
+            collecting = True
+            after_blank = False
+        elif collecting and not line.strip():
+            after_blank = bool(details)
+        elif collecting:
+            if after_blank and not DETAIL_LINE.match(line):
+                collecting = False
+            else:
+                details.append(_clean(line))
+                after_blank = False
+    close()
+    return weeks
+
+
+def profile_records(profile):
+    """Typed skills/roadmap records for a stored profile.
+
+    Returns (skill_rows, roadmap_weeks, changes). Profiles saved before the
+    records existed (or by an older parser) are parsed once here and
+    ``changes`` holds the fields to write back.
+    """
+    skills_text = profile.get("skills_list", "")
+    roadmap_text = profile.get("roadmap_text", "")
+    if profile.get("parse_version") == PARSE_VERSION:
+        rows = [SkillRow(*row) for row in profile.get("skill_rows", [])]
+        weeks = [RoadmapWeek(*row) for row in profile.get("roadmap_weeks", [])]
+        return rows, weeks, {}
+    rows = parse_skill_rows(skills_text)
+    weeks = parse_roadmap_weeks(roadmap_text)
+    changes = {"parse_version": PARSE_VERSION}
+    changes.update(skill_record_fields(rows))
+    changes.update(roadmap_record_fields(weeks))
+    return rows, weeks, changes
+
+
+def skill_record_fields(rows):
+    return {"skill_rows": [row.to_row() for row in rows]}
+
+
+def roadmap_record_fields(weeks):
+    return {"roadmap_weeks": [week.to_row() for week in weeks]}
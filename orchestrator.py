@@ -0,0 +1,36 @@
+import os
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+
+# Upper bound on LLM calls in flight across all sessions of this process
+# (enforced by llm.in_flight); also the size of the fan-out pool below
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+BATCH_TIMEOUT = float(os.getenv("LLM_BATCH_TIMEOUT", "180"))
+
+_executor = ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY, thread_name_prefix="llm")
+
+
+class Batch:
+    """A group of independent LLM tasks fanned out on the shared pool.
+
+    Cancelling a batch drops every task that has not started yet; calls already
+    talking to the API finish and still populate the response cache.
+    """
+
+    def __init__(self):
+        self.futures = {}
+        self._cancelled = threading.Event()
+
+    def submit(self, name, fn, *args, **kwargs):
+        def run():
+            if self._cancelled.is_set():
+                raise CancelledError()
+            return fn(*args, **kwargs)
+        self.futures[name] = _executor.submit(run)
+        return self.futures[name]
+
+    def cancel(self):
+        self._cancelled.set()
+        for future in self.futures.values():
+            future.cancel()
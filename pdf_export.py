@@ -0,0 +1,78 @@
+from fpdf import FPDF
+
+
+def _latin1(text):
+    # The core PDF fonts only cover latin-1; LLM output often has smart quotes
+    return text.encode("latin-1", "replace").decode("latin-1")
+
+
+def _pdf_bytes(pdf):
+    # fpdf2 returns a bytearray, PyFPDF 1.x a latin-1 str
+    out = pdf.output(dest="S")
+    if isinstance(out, str):
+        return out.encode("latin-1")
+    return bytes(out)
+
+
+def _line_count(pdf, width, line_height, text):
+    # How many lines multi_cell will wrap ``text`` into, without drawing it
+    try:
+        lines = pdf.multi_cell(width, line_height, text, dry_run=True, output="LINES")
+    except TypeError:
+        # PyFPDF 1.x
+        lines = pdf.multi_cell(width, line_height, text, split_only=True)
+    return max(len(lines), 1)
+
+
+def _week_table_header(pdf):
+    pdf.set_font("Helvetica", "B", 11)
+    pdf.cell(35, 8, "Week", border=1)
+    pdf.cell(125, 8, "Task", border=1)
+    pdf.cell(25, 8, "Score", border=1)
+    pdf.ln(8)
+    pdf.set_font("Helvetica", size=10)
+
+
+def render_roadmap_pdf(roadmap_text, weeks, scores):
+    """Render the roadmap PDF fully in memory and return its bytes.
+
+    ``weeks`` is a list of (week, task) pairs and ``scores`` maps week to the
+    assessment score, as kept in ``assessment_scores``.
+    """
+    pdf = FPDF()
+    pdf.set_auto_page_break(True, margin=15)
+    pdf.add_page()
+    pdf.set_font("Helvetica", "B", 14)
+    pdf.cell(0, 10, "Personalized Learning Roadmap", align="C")
+    pdf.ln(14)
+
+    if weeks:
+        _week_table_header(pdf)
+        for week, task in weeks:
+            task = _latin1(task)
+            # Measure first: a row must not be split by the automatic page break,
+            # or its Week and Score cells end up on the wrong page
+            height = _line_count(pdf, 125, 6, task) * 6
+            if pdf.get_y() + height > pdf.page_break_trigger:
+                pdf.add_page()
+                _week_table_header(pdf)
+            score = scores.get(week)
+            x, y = pdf.l_margin, pdf.get_y()
+            pdf.set_xy(x + 35, y)
+            pdf.multi_cell(125, 6, task, border=1)
+            pdf.set_xy(x, y)
+            pdf.cell(35, height, _latin1(week), border=1)
+            pdf.set_xy(x + 160, y)
+            pdf.cell(25, height, f"{score:.0f}" if score is not None else "-", border=1)
+            pdf.set_xy(x, y + height)
+        pdf.ln(8)
+
+    pdf.set_font("Helvetica", "B", 12)
+    pdf.cell(0, 8, "Full roadmap")
+    pdf.ln(8)
+    pdf.set_font("Helvetica", size=11)
+    for line in roadmap_text.split('\n'):
+        # PyFPDF and fpdf2 leave the cursor in different places after multi_cell
+        pdf.set_x(pdf.l_margin)
+        pdf.multi_cell(0, 7, _latin1(line))
+    return _pdf_bytes(pdf)
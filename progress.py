@@ -0,0 +1,41 @@
+from models import roadmap_hash
+
+
+PASS_MARK = 70
+
+
+def new_progress(roadmap_text):
+    # Progress belongs to one roadmap; regenerating the roadmap starts over
+    return {
+        "roadmap": roadmap_hash(roadmap_text),
+        "current_week_index": 0,
+        "scores": {},
+        "mastered": [],
+        "attempts": {},
+    }
+
+
+def restore_progress(profile):
+    progress = profile.get("progress")
+    if not progress or progress.get("roadmap") != roadmap_hash(profile.get("roadmap_text", "")):
+        return new_progress(profile.get("roadmap_text", ""))
+    return progress
+
+
+def progress_for_roadmap(progress, roadmap_text):
+    # Regenerating an identical roadmap (e.g. from the response cache) keeps progress
+    if progress and progress.get("roadmap") == roadmap_hash(roadmap_text):
+        return progress
+    return new_progress(roadmap_text)
+
+
+def record_score(scores, mastered, week, score, pass_mark=PASS_MARK):
+    """Apply one submitted assessment to the running aggregates in place.
+
+    ``mastered`` is a set of passed weeks; a week stays mastered once passed.
+    Returns True when the week counts as passed.
+    """
+    scores[week] = score
+    if score >= pass_mark:
+        mastered.add(week)
+    return week in mastered
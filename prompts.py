@@ -0,0 +1,181 @@
+import os
+import re
+
+
+# Prompt size budgets (estimated tokens) per call site; free-text fields are
+# trimmed to fit
+PROMPT_BUDGETS = {
+    "analyze_profile": 600,
+    "recommend_skills_plus": 600,
+    "get_roadmap": 800,
+    "suggest_job_profiles": 500,
+    "generate_mcqs": 500,
+}
+DEFAULT_PROMPT_BUDGET = 600
+
+# Longest any single user-provided field may get
+FIELD_BUDGETS = {
+    "role": 40,
+    "goal": 120,
+    "skills": 250,
+    "roadmap_skills": 80,
+    "task": 300,
+}
+
+# Completion length each call site actually needs
+MAX_TOKENS = {
+    "analyze_profile": 1024,
+    "recommend_skills_plus": 600,
+    "get_roadmap": 2048,
+    "suggest_job_profiles": 350,
+}
+MCQ_TOKENS_PER_QUESTION = 120
+
+# Cheap, formulaic sites run on a smaller, faster model; everything else
+# uses llm.DEFAULT_MODEL
+FAST_MODEL = os.getenv("LLM_FAST_MODEL", "llama-3.1-8b-instant")
+SITE_MODELS = {
+    "suggest_job_profiles": FAST_MODEL,
+}
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+SKILL_SEPARATORS = re.compile(r"[,;\n]+")
+ELLIPSIS = "…"
+
+
+def count_tokens(text):
+    # Local stand-in for the model tokenizer: one token per short word or
+    # symbol, long words split roughly every six characters
+    return sum(1 + (len(token) - 1) // 6 for token in TOKEN_PATTERN.findall(text))
+
+
+def fit(text, max_tokens):
+    """Collapse whitespace and cut ``text`` at a word boundary to ``max_tokens``."""
+    text = " ".join(text.split())
+    if count_tokens(text) <= max_tokens:
+        return text
+    kept, used = [], 0
+    for word in text.split(" "):
+        used += count_tokens(word)
+        if used > max_tokens - 1:
+            break
+        kept.append(word)
+    return " ".join(kept) + ELLIPSIS if kept else ""
+
+
+def skill_list(skills):
+    # "SQL, sql ,Python;  excel" -> ["SQL", "Python", "excel"]
+    seen = {}
+    for skill in SKILL_SEPARATORS.split(skills if isinstance(skills, str) else ",".join(skills)):
+        skill = " ".join(skill.split()).strip(" -*•.")
+        if skill and skill.lower() not in seen:
+            seen[skill.lower()] = skill
+    return list(seen.values())
+
+
+def fit_skills(skills, max_tokens):
+    # Drops whole skills from the end rather than cutting one in half
+    kept = []
+    for skill in skill_list(skills):
+        if count_tokens(", ".join(kept + [skill])) > max_tokens:
+            if not kept:
+                # One long free-text entry: cut it instead
+                return fit(skill, max_tokens)
+            break
+        kept.append(skill)
+    return ", ".join(kept)
+
+
+def _render(site, build, fields):
+    # Shrink the largest field until the whole prompt fits the site budget
+    prompt = build(**fields)
+    over = count_tokens(prompt) - PROMPT_BUDGETS.get(site, DEFAULT_PROMPT_BUDGET)
+    while over > 0:
+        name = max(fields, key=lambda k: count_tokens(fields[k]))
+        size = count_tokens(fields[name])
+        if not size:
+            break
+        fields[name] = fit(fields[name], size - over)
+        prompt = build(**fields)
+        over = count_tokens(prompt) - PROMPT_BUDGETS.get(site, DEFAULT_PROMPT_BUDGET)
+    return prompt
+
+
+def profile_fields(role, skills, goal):
+    return {
+        "role": fit(role, FIELD_BUDGETS["role"]),
+        "skills": fit_skills(skills, FIELD_BUDGETS["skills"]),
+        "goal": fit(goal, FIELD_BUDGETS["goal"]),
+    }
+
+
+def call_options(site, max_tokens=None):
+    # Keyword arguments for llm.complete / llm.stream_complete
+    options = {"max_tokens": max_tokens or MAX_TOKENS.get(site)}
+    if site in SITE_MODELS:
+        options["model"] = SITE_MODELS[site]
+    return options
+
+
+def analyze_profile_prompt(role, skills, goal):
+    return _render("analyze_profile", lambda role, skills, goal: (
+        f"Analyze the following professional profile:\nCurrent Role: {role}\nCurrent Skills: {skills}\nCareer Goal: {goal}\n\n"
+        "Provide a detailed analysis including strengths, skill gaps, and suggestions."
+    ), profile_fields(role, skills, goal))
+
+
+def recommend_skills_prompt(role, skills, goal):
+    return _render("recommend_skills_plus", lambda role, skills, goal: (
+        f"Profile:\nRole:{role}\nSkills:{skills}\nGoal:{goal}\n"
+        "List top 5 skills user should learn (each on a new line), with:\n"
+        "Skill name | Brief description | Top verified resource name | Resource link\n"
+        "Example:\nMachine Learning | Fundamentals of ML algorithms | Coursera ML course | https://coursera.org/ml\n"
+        "Give real, reputable resources."
+    ), profile_fields(role, skills, goal))
+
+
+def roadmap_prompt(role, skills, goal, roadmap_skills=None):
+    def build(role, skills, goal, roadmap_skills):
+        extra_skill_info = ""
+        if roadmap_skills:
+            extra_skill_info = f"\nSkills chosen for roadmap: {roadmap_skills}"
+        return (
+            f"Profile:\nRole: {role}\nSkills: {skills}\nGoal: {goal}\n"
+            f"{extra_skill_info}\n"
+            "Generate a week-by-week learning roadmap (plain text) to help the user achieve their goal."
+        )
+    fields = profile_fields(role, skills, goal)
+    fields["roadmap_skills"] = fit_skills(roadmap_skills or [], FIELD_BUDGETS["roadmap_skills"])
+    return _render("get_roadmap", build, fields)
+
+
+def job_profiles_prompt(goal, skills, roadmap_skills=None):
+    def build(goal, skills, skillset):
+        return f"""Suggest 3-5 concrete job profiles a user can apply for after completing the following career learning plan.
+User goal: {goal}
+User skills: {skills}
+Skills planned: {skillset}
+For each, give:
+- Role title
+- 1-line description matching skillset and goal
+Respond as a markdown unordered list.
+Avoid duplicates. Do not repeat the user's own goal unless it's a stepping-stone variant.
+"""
+    return _render("suggest_job_profiles", build, {
+        "goal": fit(goal, FIELD_BUDGETS["goal"]),
+        "skills": fit_skills(skills, FIELD_BUDGETS["skills"]),
+        "skillset": fit_skills(roadmap_skills or [], FIELD_BUDGETS["roadmap_skills"]),
+    })
+
+
+def mcq_prompt(task, count, set_number, total_sets):
+    def build(task):
+        return f"""For this task generate {count} multiple-choice questions (question set {set_number} of {total_sets}; cover different aspects than the other sets).
+Respond as JSON list with objects containing: "question" (str), "options" (list of 4 strings), and "answer" (correct option text).
+Task description: {task}
+"""
+    return _render("generate_mcqs", build, {"task": fit(task, FIELD_BUDGETS["task"])})
+
+
+def mcq_max_tokens(count):
+    return count * MCQ_TOKENS_PER_QUESTION + 50
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from mcq import generate_mcqs
+
+
+QUESTION_BANK_PATH = os.getenv("QUESTION_BANK_PATH", "question_bank.db")
+
+# Coordinators only wait on generate_mcqs, whose batches run on the LLM pool;
+# keeping them off that pool means they can never starve it
+_pregenerator = ThreadPoolExecutor(max_workers=2, thread_name_prefix="question-bank")
+_pending = {}
+_pending_lock = threading.Lock()
+_local = threading.local()
+
+
+def task_key(task):
+    # The same week task typed with different case/spacing shares one entry
+    normalized = re.sub(r"\s+", " ", task).strip().lower()
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def _conn():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(QUESTION_BANK_PATH, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS question_sets ("
+            "task_key TEXT PRIMARY KEY, task TEXT, questions TEXT, created_at REAL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS question_stats ("
+            "question_key TEXT PRIMARY KEY, task_key TEXT, question TEXT, answer TEXT, "
+            "attempts INTEGER NOT NULL, correct INTEGER NOT NULL)"
+        )
+        _local.conn = conn
+    return conn
+
+
+def lookup(task):
+    row = _conn().execute("SELECT questions FROM question_sets WHERE task_key = ?", (task_key(task),)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def store(task, questions):
+    with _conn() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO question_sets (task_key, task, questions, created_at) VALUES (?, ?, ?, ?)",
+            (task_key(task), task, json.dumps(questions), time.time()),
+        )
+
+
+def _generate_and_store(task, on_question=None, bypass_cache=False):
+    questions, errors = generate_mcqs(task, on_question=on_question, bypass_cache=bypass_cache)
+    # Only complete sets go in the bank so a bad generation is not served to everyone
+    if questions and not errors:
+        store(task, questions)
+    return questions, errors
+
+
+def _claim(task, fn, *args):
+    # One generation per task across all sessions; later callers share the future
+    key = task_key(task)
+    with _pending_lock:
+        future = _pending.get(key)
+        if future is None:
+            future = _pending[key] = _pregenerator.submit(fn, task, *args)
+            future.add_done_callback(lambda f: _release(key, f))
+        return future
+
+
+def _release(key, future):
+    with _pending_lock:
+        if _pending.get(key) is future:
+            del _pending[key]
+
+
+def pregenerate(task):
+    # Fire-and-forget: make sure the bank has questions for ``task``
+    if not task or lookup(task) is not None:
+        return None
+    return _claim(task, _generate_and_store)
+
+
+def get_or_generate(task, on_question=None, regenerate=False):
+    """Return (questions, errors) for ``task``, generating only on a bank miss.
+
+    A pre-generation already running for the same task is awaited instead of
+    starting a second one. ``regenerate`` replaces the banked set.
+    """
+    if regenerate:
+        return _generate_and_store(task, on_question, True)
+    banked = lookup(task)
+    if banked is not None:
+        return banked, []
+    with _pending_lock:
+        future = _pending.get(task_key(task))
+    if future is not None:
+        return future.result()
+    return _generate_and_store(task, on_question)
+
+
+def question_key(question):
+    return hashlib.sha256(f"{question['question']}\n{question['answer']}".encode()).hexdigest()
+
+
+def record_answers(task, questions, correct):
+    # Aggregated over every user who answered the same banked question
+    rows = [
+        (question_key(q), task_key(task), q["question"], q["answer"], int(c))
+        for q, c in zip(questions, correct)
+    ]
+    with _conn() as conn:
+        conn.executemany(
+            "INSERT INTO question_stats (question_key, task_key, question, answer, attempts, correct) "
+            "VALUES (?, ?, ?, ?, 1, ?) "
+            "ON CONFLICT(question_key) DO UPDATE SET "
+            "attempts = attempts + 1, correct = correct + excluded.correct",
+            rows,
+        )
+
+
+def question_stats(min_attempts=5, limit=50):
+    """Questions ordered by correct rate, lowest first.
+
+    A rate near 0% across many users usually means a wrong answer key; near
+    100% means the question is too easy to be useful.
+    """
+    return _conn().execute(
+        "SELECT question, answer, attempts, correct, CAST(correct AS REAL) / attempts AS rate "
+        "FROM question_stats WHERE attempts >= ? ORDER BY rate ASC, attempts DESC LIMIT ?",
+        (min_attempts, limit),
+    ).fetchall()
@@ -0,0 +1,139 @@
+import random
+import threading
+import time
+
+
+class TokenBucket:
+    """Refills ``per_minute`` units per minute up to ``capacity``."""
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.level = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount):
+        # Take ``amount`` now (possibly going into debt) and return how long the
+        # caller must wait before the bucket is back to zero
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            self.level -= amount
+            return max(0.0, -self.level / self.rate)
+
+    def adjust(self, amount):
+        # Give back (positive) or charge (negative) units after the fact,
+        # e.g. once the real token usage of a completion is known
+        with self._lock:
+            self._refill(time.monotonic())
+            self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """Client-side requests-per-minute and tokens-per-minute limits."""
+
+    def __init__(self, requests_per_minute, tokens_per_minute, sleep=time.sleep):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.sleep = sleep
+
+    def acquire(self, estimated_tokens):
+        delay = max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+        if delay:
+            self.sleep(delay)
+        return delay
+
+    def settle(self, estimated_tokens, actual_tokens):
+        self.tokens.adjust(estimated_tokens - actual_tokens)
+
+
+def backoff_delay(attempt, base_delay, max_delay):
+    # "Full jitter" exponential backoff
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+def retry_after(error):
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_call(fn, is_retryable, retries=4, base_delay=0.5, max_delay=20.0, sleep=time.sleep):
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except Exception as e:
+            if attempt >= retries or not is_retryable(e):
+                raise
+            delay = retry_after(e)
+            if delay is None:
+                delay = backoff_delay(attempt, base_delay, max_delay)
+            sleep(min(delay, max_delay))
+            attempt += 1
+
+
+class Abandoned(Exception):
+    """The leader of a single-flight call went away without a result."""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one upstream call."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def begin(self, key):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                return call, False
+            call = self._calls[key] = _Call()
+            return call, True
+
+    def finish(self, key, call, result=None, error=None):
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.result, call.error = result, error
+        call.done.set()
+
+    def do(self, key, fn):
+        while True:
+            call, leader = self.begin(key)
+            if not leader:
+                try:
+                    return call.wait()
+                except Abandoned:
+                    continue
+            try:
+                result = fn()
+            except BaseException as e:
+                self.finish(key, call, error=e if isinstance(e, Exception) else Abandoned())
+                raise
+            self.finish(key, call, result=result)
+            return result
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+log = logging.getLogger(__name__)
+
+CACHE_DB_FILE = os.getenv("LLM_CACHE_FILE", "llm_cache.db")
+CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512"))
+# Expired rows are deleted at startup and then at most this often (seconds)
+CACHE_PURGE_INTERVAL = int(os.getenv("LLM_CACHE_PURGE_INTERVAL", "3600"))
+
+
+def normalize_prompt(prompt):
+    # collapse whitespace so re-indented / re-typed profiles map to the same key
+    lines = [re.sub(r"\s+", " ", line).strip() for line in prompt.strip().splitlines()]
+    return "\n".join(line for line in lines if line)
+
+
+def make_key(model, prompt, **params):
+    payload = json.dumps(
+        {"model": model, "prompt": normalize_prompt(prompt), "params": params},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResponseCache:
+    """Bounded in-memory LRU in front of a SQLite store that survives restarts."""
+
+    def __init__(self, db_file=CACHE_DB_FILE, max_entries=CACHE_MAX_ENTRIES):
+        self.db_file = db_file
+        self.max_entries = max_entries
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = {}
+        self.misses = {}
+        self._purged_at = 0.0
+        self._init_db()
+        self.purge_expired()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_file, timeout=10)
+
+    def _init_db(self):
+        if not self.db_file:
+            return
+        with self._connect() as conn:
+            # Readers do not block the writer (or each other) across sessions
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, site TEXT, value TEXT, expires_at REAL)"
+            )
+
+    def _count(self, counter, site):
+        counter[site] = counter.get(site, 0) + 1
+
+    def get(self, key, site=""):
+        now = time.time()
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._lru.move_to_end(key)
+                    self._count(self.hits, site)
+                    return value
+                del self._lru[key]
+        row = None
+        if self.db_file:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+        with self._lock:
+            if row and row[1] > now:
+                value = json.loads(row[0])
+                self._remember(key, value, row[1])
+                self._count(self.hits, site)
+                return value
+            self._count(self.misses, site)
+        return None
+
+    def set(self, key, value, ttl, site=""):
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._remember(key, value, expires_at)
+        # The answer is already in memory and about to be returned; a locked or
+        # read-only database only costs a later miss, so it must not fail the request
+        try:
+            if self.db_file:
+                with self._connect() as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO responses (key, site, value, expires_at) VALUES (?, ?, ?, ?)",
+                        (key, site, json.dumps(value), expires_at),
+                    )
+            if time.time() - self._purged_at > CACHE_PURGE_INTERVAL:
+                self.purge_expired()
+        except sqlite3.Error as e:
+            log.warning("Could not write to the response cache %s: %s", self.db_file, e)
+
+    def _remember(self, key, value, expires_at):
+        self._lru[key] = (value, expires_at)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def purge_expired(self):
+        now = time.time()
+        self._purged_at = now
+        with self._lock:
+            for key in [k for k, (_, exp) in self._lru.items() if exp <= now]:
+                del self._lru[key]
+        if self.db_file:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+
+    def stats(self):
+        with self._lock:
+            sites = sorted(set(self.hits) | set(self.misses))
+            return {
+                site: {"hits": self.hits.get(site, 0), "misses": self.misses.get(site, 0)}
+                for site in sites
+            }
@@ -0,0 +1,259 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from prompts import skill_list
+from response_cache import CACHE_DB_FILE, CACHE_PURGE_INTERVAL
+
+
+log = logging.getLogger(__name__)
+
+
+# Minimum per-field Jaccard similarity (role words, skill set, goal words) for
+# a stored answer to be served for a new profile. 1.0 serves only profiles
+# that canonicalize identically; above 1.0 turns the lookup off.
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.8"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16
+LSH_ROWS = MINHASH_PERMUTATIONS // LSH_BANDS
+
+# Filler words that change the phrasing of a role or goal but not its meaning
+STOP_WORDS = {
+    "a", "an", "and", "as", "at", "be", "become", "becoming", "for", "get", "i", "in", "into", "job",
+    "my", "of", "on", "position", "role", "the", "to", "want", "work", "working", "would", "like",
+}
+WORD = re.compile(r"[a-z0-9+#.]+")
+
+
+
+def _words(text):
+    return frozenset(w.strip(".") for w in WORD.findall(text.lower()) if w.strip(".") not in STOP_WORDS)
+
+
+def canonical_profile(role, skills, goal):
+    """Role and goal as word sets, skills as a lowercased de-duplicated set."""
+    return {
+        "role": _words(role),
+        "skills": frozenset(s.lower() for s in skill_list(skills)),
+        "goal": _words(goal),
+    }
+
+
+def profile_key(fields):
+    return hashlib.sha256(json.dumps({k: sorted(v) for k, v in fields.items()}, sort_keys=True).encode()).hexdigest()
+
+
+def _shingles(fields):
+    return [f"{name}:{item}" for name, items in fields.items() for item in items]
+
+
+@lru_cache(maxsize=None)
+def _hash_family():
+    # Multiply-shift hash family: (a * x + b) >> 32 over uint64, a odd
+    import numpy as np
+    rng = np.random.default_rng(20240611)
+    a = rng.integers(1, 2 ** 63, MINHASH_PERMUTATIONS, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2 ** 63, MINHASH_PERMUTATIONS, dtype=np.uint64)
+    return a, b
+
+
+def minhash(shingles):
+    import numpy as np
+    a, b = _hash_family()
+    x = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "little") for s in shingles),
+        dtype=np.uint64, count=len(shingles),
+    )
+    with np.errstate(over="ignore"):
+        return ((a[:, None] * x[None, :] + b[:, None]) >> np.uint64(32)).min(axis=1)
+
+
+def _bands(signature):
+    return [(band, signature[band * LSH_ROWS:(band + 1) * LSH_ROWS].tobytes()) for band in range(LSH_BANDS)]
+
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def similarity(a, b):
+    # The weakest field decides: same skills with a different goal is a miss
+    return min(jaccard(a[name], b[name]) for name in a)
+
+
+class SimilarProfileCache:
+    """Answers for earlier profiles, found by MinHash/LSH and checked by exact Jaccard.
+
+    One index per call site. Entries live in the response cache database so
+    they survive restarts; the newest SEMANTIC_CACHE_MAX_ENTRIES per site are
+    kept in memory.
+    """
+
+    def __init__(self, db_file=CACHE_DB_FILE, threshold=SEMANTIC_CACHE_THRESHOLD,
+                 max_entries=SEMANTIC_CACHE_MAX_ENTRIES):
+        self.db_file = db_file
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._buckets = {}
+        self.lookups = {}
+        self.hits = {}
+        self.exact_hits = {}
+        self.similarity_sums = {}
+        self._purged_at = 0.0
+        self._init_db()
+        self.purge_expired()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_file, timeout=10)
+
+    def _init_db(self):
+        if not self.db_file:
+            return
+        with self._connect() as conn:
+            # Readers do not block the writer (or each other) across sessions
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS similar_profiles ("
+                "site TEXT, key TEXT, fields TEXT, value TEXT, expires_at REAL, PRIMARY KEY (site, key))"
+            )
+
+    def _site(self, site):
+        # Lazily load a site's index from the database; caller holds the lock
+        if site in self._entries:
+            return self._entries[site]
+        entries = self._entries[site] = OrderedDict()
+        self._buckets[site] = {}
+        if self.db_file:
+            try:
+                with self._connect() as conn:
+                    rows = conn.execute(
+                        "SELECT key, fields, value, expires_at FROM similar_profiles "
+                        "WHERE site = ? AND expires_at > ? ORDER BY expires_at DESC LIMIT ?",
+                        (site, time.time(), self.max_entries),
+                    ).fetchall()
+            except sqlite3.Error as e:
+                # Start this site empty rather than fail the lookup
+                log.warning("Could not read the similar-profile cache %s: %s", self.db_file, e)
+                rows = []
+            for key, fields, value, expires_at in reversed(rows):
+                fields = {name: frozenset(items) for name, items in json.loads(fields).items()}
+                self._index(site, key, fields, json.loads(value), expires_at)
+        return entries
+
+    def _index(self, site, key, fields, value, expires_at):
+        entries, buckets = self._entries[site], self._buckets[site]
+        if key in entries:
+            self._unindex(site, key)
+        signature = minhash(_shingles(fields))
+        entries[key] = (fields, value, expires_at, signature)
+        for band in _bands(signature):
+            buckets.setdefault(band, set()).add(key)
+        while len(entries) > self.max_entries:
+            self._unindex(site, next(iter(entries)))
+
+    def _unindex(self, site, key):
+        fields, value, expires_at, signature = self._entries[site].pop(key)
+        buckets = self._buckets[site]
+        for band in _bands(signature):
+            bucket = buckets.get(band)
+            if bucket:
+                bucket.discard(key)
+                if not bucket:
+                    del buckets[band]
+
+    def get(self, site, role, skills, goal):
+        """Stored answer for the most similar earlier profile, or None."""
+        fields = canonical_profile(role, skills, goal)
+        key = profile_key(fields)
+        now = time.time()
+        with self._lock:
+            self.lookups[site] = self.lookups.get(site, 0) + 1
+            if self.threshold > 1:
+                return None
+            entries = self._site(site)
+            best, best_score = None, 0.0
+            if key in entries:
+                best, best_score = key, 1.0
+            elif self.threshold < 1 and _shingles(fields):
+                buckets = self._buckets[site]
+                candidates = set()
+                for band in _bands(minhash(_shingles(fields))):
+                    candidates |= buckets.get(band, set())
+                for candidate in candidates:
+                    score = similarity(fields, entries[candidate][0])
+                    if score > best_score:
+                        best, best_score = candidate, score
+            if best is None or best_score < self.threshold:
+                return None
+            _, value, expires_at, _ = entries[best]
+            if expires_at <= now:
+                self._unindex(site, best)
+                return None
+            entries.move_to_end(best)
+            self.hits[site] = self.hits.get(site, 0) + 1
+            if best_score == 1.0:
+                self.exact_hits[site] = self.exact_hits.get(site, 0) + 1
+            self.similarity_sums[site] = self.similarity_sums.get(site, 0.0) + best_score
+            return value
+
+    def set(self, site, role, skills, goal, value, ttl):
+        fields = canonical_profile(role, skills, goal)
+        if not _shingles(fields):
+            return
+        key = profile_key(fields)
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._site(site)
+            self._index(site, key, fields, value, expires_at)
+        # As in ResponseCache.set, a failed write only costs a later miss
+        try:
+            if self.db_file:
+                with self._connect() as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO similar_profiles (site, key, fields, value, expires_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (site, key, json.dumps({k: sorted(v) for k, v in fields.items()}), json.dumps(value),
+                         expires_at),
+                    )
+            if time.time() - self._purged_at > CACHE_PURGE_INTERVAL:
+                self.purge_expired()
+        except sqlite3.Error as e:
+            log.warning("Could not write to the similar-profile cache %s: %s", self.db_file, e)
+
+    def purge_expired(self):
+        now = time.time()
+        self._purged_at = now
+        with self._lock:
+            for site, entries in self._entries.items():
+                for key in [k for k, (_, _, expires_at, _) in entries.items() if expires_at <= now]:
+                    self._unindex(site, key)
+        if self.db_file:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM similar_profiles WHERE expires_at <= ?", (now,))
+
+    def stats(self):
+        with self._lock:
+            return {
+                site: {
+                    "lookups": lookups,
+                    "hits": self.hits.get(site, 0),
+                    "exact_hits": self.exact_hits.get(site, 0),
+                    "hit_rate": self.hits.get(site, 0) / lookups,
+                    "mean_similarity": self.similarity_sums[site] / self.hits[site] if self.hits.get(site) else None,
+                    "entries": len(self._entries.get(site, ())),
+                }
+                for site, lookups in sorted(self.lookups.items())
+            }
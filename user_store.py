@@ -0,0 +1,325 @@
+import json
+import os
+import sqlite3
+import threading
+
+
+USER_STORE_BACKEND = os.getenv("USER_STORE_BACKEND", "sqlite")
+USER_STORE_PATH = os.getenv("USER_STORE_PATH", "users.db")
+LEGACY_JSON_FILE = "users_db.json"
+# Users per chunk for bulk reads and imports
+USER_STORE_CHUNK_SIZE = int(os.getenv("USER_STORE_CHUNK_SIZE", "1000"))
+
+
+class JsonUserStore:
+    """The original whole-file JSON store, kept for small/dev deployments."""
+
+    def __init__(self, path=LEGACY_JSON_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, "r") as f:
+            return json.load(f)
+
+    def _write(self, users):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(users, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def get_password(self, username):
+        with self._lock:
+            user = self._read().get(username)
+        return user["password"] if user else None
+
+    def set_password(self, username, password_hash):
+        with self._lock:
+            users = self._read()
+            if username in users:
+                users[username]["password"] = password_hash
+                self._write(users)
+
+    def token_generation(self, username):
+        with self._lock:
+            user = self._read().get(username)
+        return user.get("token_generation", 0) if user else None
+
+    def bump_token_generation(self, username):
+        with self._lock:
+            users = self._read()
+            if username in users:
+                users[username]["token_generation"] = users[username].get("token_generation", 0) + 1
+                self._write(users)
+
+    def create_user(self, username, password_hash, profile=None):
+        with self._lock:
+            users = self._read()
+            if username in users:
+                return False
+            users[username] = {"password": password_hash, "profile": profile or {}}
+            self._write(users)
+        return True
+
+    def get_profile(self, username):
+        with self._lock:
+            user = self._read().get(username)
+        return user.get("profile", {}) if user else {}
+
+    def replace_profile(self, username, profile):
+        with self._lock:
+            users = self._read()
+            if username in users:
+                users[username]["profile"] = profile
+                self._write(users)
+
+    def update_profile(self, username, changes, remove=()):
+        with self._lock:
+            users = self._read()
+            if username not in users:
+                return {}
+            profile = users[username].setdefault("profile", {})
+            profile.update(changes)
+            for field in remove:
+                profile.pop(field, None)
+            self._write(users)
+        return profile
+
+    def iter_users(self, chunk_size=USER_STORE_CHUNK_SIZE):
+        """Yield lists of (username, password_hash, profile), ``chunk_size`` users at a time."""
+        # The whole file is parsed anyway; only the consumer sees chunks
+        with self._lock:
+            users = list(self._read().items())
+        for start in range(0, len(users), chunk_size):
+            yield [(username, user["password"], user.get("profile", {}))
+                   for username, user in users[start:start + chunk_size]]
+
+    def import_users(self, users):
+        """Create or replace (username, password_hash, profile) entries in one write.
+
+        Existing users get the given profile (and password, when not None);
+        new users without a password are skipped. Returns (created, updated, skipped).
+        """
+        created = updated = skipped = 0
+        with self._lock:
+            stored = self._read()
+            for username, password_hash, profile in users:
+                if username in stored:
+                    stored[username]["profile"] = profile
+                    if password_hash:
+                        stored[username]["password"] = password_hash
+                    updated += 1
+                elif password_hash:
+                    stored[username] = {"password": password_hash, "profile": profile}
+                    created += 1
+                else:
+                    skipped += 1
+            self._write(stored)
+        return created, updated, skipped
+
+
+class SqliteUserStore:
+    """Per-user keyed reads/writes on SQLite in WAL mode.
+
+    Profiles are stored one row per field so updating ``skills_list`` does not
+    rewrite a large ``roadmap_text``.
+    """
+
+    def __init__(self, path=USER_STORE_PATH, legacy_json=LEGACY_JSON_FILE):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS users ("
+                "username TEXT PRIMARY KEY, password TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS profile_fields ("
+                "username TEXT NOT NULL REFERENCES users(username), "
+                "field TEXT NOT NULL, value TEXT NOT NULL, "
+                "PRIMARY KEY (username, field))"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(users)")}
+            if "token_generation" not in columns:
+                # Bumped on logout; session tokens carrying an older value are refused
+                conn.execute("ALTER TABLE users ADD COLUMN token_generation INTEGER NOT NULL DEFAULT 0")
+        if legacy_json:
+            self.migrate_from_json(legacy_json)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        return _Transaction(self._conn())
+
+    def migrate_from_json(self, json_path):
+        if not os.path.exists(json_path):
+            return 0
+        with self._transaction() as conn:
+            done = conn.execute(
+                "SELECT value FROM meta WHERE key = 'migrated_from_json'"
+            ).fetchone()
+            if done:
+                return 0
+            with open(json_path, "r") as f:
+                users = json.load(f)
+            for username, user in users.items():
+                conn.execute(
+                    "INSERT OR IGNORE INTO users (username, password) VALUES (?, ?)",
+                    (username, user["password"]),
+                )
+                self._write_fields(conn, username, user.get("profile", {}))
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('migrated_from_json', ?)", (json_path,)
+            )
+        return len(users)
+
+    def _write_fields(self, conn, username, fields):
+        conn.executemany(
+            "INSERT OR REPLACE INTO profile_fields (username, field, value) VALUES (?, ?, ?)",
+            [(username, field, json.dumps(value)) for field, value in fields.items()],
+        )
+
+    def _read_fields(self, conn, username):
+        rows = conn.execute(
+            "SELECT field, value FROM profile_fields WHERE username = ?", (username,)
+        ).fetchall()
+        return {field: json.loads(value) for field, value in rows}
+
+    def get_password(self, username):
+        row = self._conn().execute(
+            "SELECT password FROM users WHERE username = ?", (username,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_password(self, username, password_hash):
+        with self._transaction() as conn:
+            conn.execute("UPDATE users SET password = ? WHERE username = ?", (password_hash, username))
+
+    def token_generation(self, username):
+        row = self._conn().execute(
+            "SELECT token_generation FROM users WHERE username = ?", (username,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def bump_token_generation(self, username):
+        with self._transaction() as conn:
+            conn.execute("UPDATE users SET token_generation = token_generation + 1 WHERE username = ?", (username,))
+
+    def create_user(self, username, password_hash, profile=None):
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO users (username, password) VALUES (?, ?)",
+                (username, password_hash),
+            )
+            if cursor.rowcount == 0:
+                return False
+            self._write_fields(conn, username, profile or {})
+        return True
+
+    def get_profile(self, username):
+        return self._read_fields(self._conn(), username)
+
+    def replace_profile(self, username, profile):
+        with self._transaction() as conn:
+            if not conn.execute("SELECT 1 FROM users WHERE username = ?", (username,)).fetchone():
+                return
+            conn.execute("DELETE FROM profile_fields WHERE username = ?", (username,))
+            self._write_fields(conn, username, profile)
+
+    def update_profile(self, username, changes, remove=()):
+        with self._transaction() as conn:
+            if not conn.execute("SELECT 1 FROM users WHERE username = ?", (username,)).fetchone():
+                return {}
+            self._write_fields(conn, username, changes)
+            conn.executemany(
+                "DELETE FROM profile_fields WHERE username = ? AND field = ?",
+                [(username, field) for field in remove],
+            )
+            return self._read_fields(conn, username)
+
+    def iter_users(self, chunk_size=USER_STORE_CHUNK_SIZE):
+        """Yield lists of (username, password_hash, profile), ``chunk_size`` users at a time."""
+        conn = self._conn()
+        users = conn.execute(
+            "SELECT username, password FROM users ORDER BY username LIMIT ?", (chunk_size,)
+        ).fetchall()
+        while users:
+            profiles = {username: {} for username, _ in users}
+            # Keyset range over the (username, field) primary key, not an IN list
+            rows = conn.execute(
+                "SELECT username, field, value FROM profile_fields WHERE username BETWEEN ? AND ?",
+                (users[0][0], users[-1][0]),
+            )
+            for username, field, value in rows:
+                if username in profiles:
+                    profiles[username][field] = json.loads(value)
+            yield [(username, password, profiles[username]) for username, password in users]
+            users = conn.execute(
+                "SELECT username, password FROM users WHERE username > ? ORDER BY username LIMIT ?",
+                (users[-1][0], chunk_size),
+            ).fetchall()
+
+    def import_users(self, users):
+        """Create or replace (username, password_hash, profile) entries in one transaction.
+
+        Existing users get the given profile (and password, when not None);
+        new users without a password are skipped. Returns (created, updated, skipped).
+        """
+        created = updated = skipped = 0
+        with self._transaction() as conn:
+            for username, password_hash, profile in users:
+                if conn.execute("SELECT 1 FROM users WHERE username = ?", (username,)).fetchone():
+                    if password_hash:
+                        conn.execute("UPDATE users SET password = ? WHERE username = ?", (password_hash, username))
+                    conn.execute("DELETE FROM profile_fields WHERE username = ?", (username,))
+                    updated += 1
+                elif password_hash:
+                    conn.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, password_hash))
+                    created += 1
+                else:
+                    skipped += 1
+                    continue
+                self._write_fields(conn, username, profile)
+        return created, updated, skipped
+
+
+class _Transaction:
+    # BEGIN IMMEDIATE takes the write lock up front so concurrent
+    # read-modify-write sequences from other sessions serialize cleanly
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            if USER_STORE_BACKEND == "json":
+                _store = JsonUserStore()
+            else:
+                _store = SqliteUserStore()
+    return _store